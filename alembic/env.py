@@ -5,14 +5,19 @@ from sqlalchemy import pool
 
 from alembic import context
 
+from app.core.config import settings
 from app.core.database import Base
 from app.models.user import User
-from app.models.task import Task
+from app.models.task import Favorite
+from app.models.pokemon import Pokemon, PokemonCacheEntry
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
+# Migrate the database the application is configured to use
+config.set_main_option("sqlalchemy.url", settings.database_url.replace("%", "%%"))
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
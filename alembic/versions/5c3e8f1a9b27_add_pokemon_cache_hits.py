@@ -0,0 +1,30 @@
+"""Add request counts to pokemon cache
+
+Revision ID: 5c3e8f1a9b27
+Revises: d211ddd5c6b4
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5c3e8f1a9b27"
+down_revision = "d211ddd5c6b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "pokemon_cache",
+        sa.Column("hits", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade():
+    # SQLite before 3.35 cannot drop columns in place
+    with op.batch_alter_table("pokemon_cache") as batch_op:
+        batch_op.drop_column("hits")
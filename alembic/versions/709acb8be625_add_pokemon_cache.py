@@ -0,0 +1,36 @@
+"""Add pokemon cache table
+
+Revision ID: 709acb8be625
+Revises: 672e9d6974da
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "709acb8be625"
+down_revision = "672e9d6974da"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "pokemon_cache",
+        sa.Column("pokemon_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("data", sa.JSON(), nullable=False),
+        sa.Column("fetched_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("pokemon_id"),
+    )
+    op.create_index(
+        op.f("ix_pokemon_cache_name"), "pokemon_cache", ["name"], unique=True
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_pokemon_cache_name"), table_name="pokemon_cache")
+    op.drop_table("pokemon_cache")
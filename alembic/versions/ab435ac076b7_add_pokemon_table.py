@@ -0,0 +1,39 @@
+"""Add pokemon table for the local Pokedex snapshot
+
+Revision ID: ab435ac076b7
+Revises: 709acb8be625
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "ab435ac076b7"
+down_revision = "709acb8be625"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "pokemon",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("height", sa.Integer(), nullable=False),
+        sa.Column("weight", sa.Integer(), nullable=False),
+        sa.Column("types", sa.JSON(), nullable=False),
+        sa.Column("abilities", sa.JSON(), nullable=False),
+        sa.Column("sprite_url", sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_pokemon_id"), "pokemon", ["id"], unique=False)
+    op.create_index(op.f("ix_pokemon_name"), "pokemon", ["name"], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f("ix_pokemon_name"), table_name="pokemon")
+    op.drop_index(op.f("ix_pokemon_id"), table_name="pokemon")
+    op.drop_table("pokemon")
@@ -0,0 +1,62 @@
+"""Add favorites uniqueness constraint and active favorites index
+
+Revision ID: d211ddd5c6b4
+Revises: ab435ac076b7
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d211ddd5c6b4"
+down_revision = "ab435ac076b7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Collapse duplicate (user_id, pokemon_id) rows onto the oldest one,
+    # keeping it active if any of the duplicates was active.
+    op.execute(
+        """
+        UPDATE favorites SET is_active = TRUE
+        WHERE id IN (
+            SELECT MIN(id) FROM favorites
+            GROUP BY user_id, pokemon_id
+            HAVING COUNT(*) > 1
+               AND MAX(CASE WHEN is_active THEN 1 ELSE 0 END) = 1
+        )
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM favorites
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM favorites GROUP BY user_id, pokemon_id
+        )
+        """
+    )
+
+    op.create_index(
+        "uq_favorites_user_pokemon",
+        "favorites",
+        ["user_id", "pokemon_id"],
+        unique=True,
+        postgresql_include=["is_active"],
+    )
+    op.create_index(
+        "ix_favorites_user_active_created",
+        "favorites",
+        ["user_id", "created_at", "id"],
+        unique=False,
+        sqlite_where=sa.text("is_active = 1"),
+        postgresql_where=sa.text("is_active = true"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_favorites_user_active_created", table_name="favorites")
+    op.drop_index("uq_favorites_user_pokemon", table_name="favorites")
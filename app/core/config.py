@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -5,13 +7,108 @@ class Settings(BaseSettings):
     app_name: str = "Pokemon API"
     debug: bool = False
 
+    # PostgreSQL URLs need psycopg2 for the sync engine and asyncpg for the
+    # async one. Read-only endpoints use the replica when one is configured.
     database_url: str = "sqlite:///./pokemon_api.db"
+    database_read_url: Optional[str] = None
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30.0
+    database_pool_recycle: int = 30 * 60
+    database_pool_pre_ping: bool = True
+    database_statement_timeout_ms: int = 30000
+
+    # SQLite only: WAL and related pragmas, and queueing writers in-process
+    sqlite_tuning: bool = True
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_serialize_writes: bool = True
 
     secret_key: str = "your-secret-key-here"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    principal_cache_max_entries: int = 10000
+    principal_cache_ttl_seconds: int = 60
+
+    # New hashes use the first scheme; the others are verified and upgraded.
+    # argon2 needs the argon2-cffi package.
+    password_schemes: List[str] = ["bcrypt"]
+    bcrypt_rounds: int = 12
+    argon2_memory_cost: int = 65536
+    argon2_time_cost: int = 3
+    argon2_parallelism: int = 4
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
 
     pokeapi_base_url: str = "https://pokeapi.co/api/v2"
+    pokeapi_timeout: float = 10.0
+    pokeapi_connect_timeout: float = 5.0
+    pokeapi_max_connections: int = 100
+    pokeapi_max_keepalive_connections: int = 20
+    pokeapi_keepalive_expiry: float = 30.0
+    pokeapi_http2: bool = True
+    pokeapi_list_concurrency: int = 10
+    # Per-call budget including retries, and the circuit breaker
+    pokeapi_deadline_seconds: float = 8.0
+    pokeapi_retries: int = 2
+    pokeapi_retry_backoff: float = 0.1
+    pokeapi_retry_backoff_max: float = 2.0
+    pokeapi_breaker_failures: int = 5
+    pokeapi_breaker_reset_seconds: float = 30.0
+    # Outbound request rate (0 disables) and adaptive concurrency bounds, and
+    # how long a call may queue for them; queuing is not part of the deadline
+    pokeapi_rate_limit: float = 20.0
+    pokeapi_rate_burst: int = 100
+    pokeapi_concurrency_initial: int = 20
+    pokeapi_concurrency_min: int = 2
+    pokeapi_concurrency_max: int = 100
+    pokeapi_latency_target_seconds: float = 1.0
+    pokeapi_queue_timeout_seconds: float = 10.0
+
+    pokemon_cache_max_entries: int = 2048
+    pokemon_cache_ttl_seconds: int = 7 * 24 * 60 * 60
+    # Expired entries are still served for this long while being refreshed
+    pokemon_cache_stale_seconds: int = 24 * 60 * 60
+    pokemon_cache_persistent: bool = True
+    # Warm the detail cache ahead of the browsing pattern: the next list
+    # page, the user's favorites at login, the most-requested ids at startup
+    pokemon_prefetch_next_page: bool = True
+    pokemon_prefetch_favorites_on_login: bool = False
+    pokemon_warmup_count: int = 100
+    pokemon_hits_flush_seconds: int = 60
+
+    # "pokeapi" proxies PokeAPI, "local" serves the imported Pokedex snapshot
+    pokemon_source: str = "pokeapi"
+
+    pokemon_search_refresh_seconds: int = 60 * 60
+    # Backoff between attempts until the name index first loads
+    pokemon_search_retry_backoff: float = 1.0
+    pokemon_search_retry_backoff_max: float = 60.0
+    # When set, the filter catalog is built once into this file and mapped
+    # read-only by every worker; workers pick up a replaced file on refresh
+    pokemon_catalog_path: Optional[str] = None
+
+    # Serialized GET responses under these path prefixes are cached and
+    # revalidated with ETags
+    response_cache_enabled: bool = True
+    response_cache_paths: List[str] = ["/api/v1/pokemon"]
+    response_cache_max_entries: int = 1024
+    response_cache_ttl_seconds: int = 5 * 60
+    response_cache_control: str = "private, max-age=300"
+
+    # brotli needs the brotli package, gzip is always available
+    compression_enabled: bool = True
+    compression_min_size: int = 1024
+    compression_media_types: List[str] = [
+        "application/json",
+        "application/x-ndjson",
+        "text/",
+    ]
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
 
     class Config:
         env_file = ".env"
@@ -1,17 +1,110 @@
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.sqlite import SerializedWriteSession, apply_sqlite_pragmas
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./pokemon_api.db"
+SQLALCHEMY_DATABASE_URL = settings.database_url
+SQLALCHEMY_READ_DATABASE_URL = settings.database_read_url
+
+# Async drivers used for each sync database URL scheme
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap the driver of a database URL for its asyncio counterpart"""
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Pool and connection options for an engine on url, from settings"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    options: Dict[str, Any] = {"pool_pre_ping": settings.database_pool_pre_ping}
+
+    if backend == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        # In-memory databases live in a single connection, there is no pool
+        if parsed.database in (None, "", ":memory:"):
+            return options
+
+    options.update(
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+        pool_recycle=settings.database_pool_recycle,
+    )
+
+    timeout = settings.database_statement_timeout_ms
+    if backend == "postgresql" and timeout:
+        if parsed.get_driver_name() == "asyncpg":
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(timeout)}
+            }
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+
+    return options
+
+
+def create_engines(url: str) -> Tuple[Engine, AsyncEngine]:
+    """Sync and async engines for url"""
+    async_url = to_async_url(url)
+    sync_engine = create_engine(url, **engine_options(url))
+    async_engine = create_async_engine(async_url, **engine_options(async_url))
+    if is_sqlite(url) and settings.sqlite_tuning:
+        apply_sqlite_pragmas(sync_engine)
+        apply_sqlite_pragmas(async_engine.sync_engine)
+    return sync_engine, async_engine
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+def is_sqlite(url: Optional[str]) -> bool:
+    if not url:
+        return False
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+engine, async_engine = create_engines(SQLALCHEMY_DATABASE_URL)
+
+# Without a replica, reads go to the primary
+read_engine, async_read_engine = engine, async_engine
+if SQLALCHEMY_READ_DATABASE_URL:
+    read_engine, async_read_engine = create_engines(SQLALCHEMY_READ_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# SQLite has a single writer, so writers queue in-process rather than
+# contending for the file lock
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=(
+        SerializedWriteSession
+        if is_sqlite(SQLALCHEMY_DATABASE_URL) and settings.sqlite_serialize_writes
+        else AsyncSession
+    ),
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -23,6 +116,17 @@ def get_db():
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db() -> AsyncIterator[AsyncSession]:
+    """Session for read-only endpoints, which may lag behind the primary"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
 def create_tables():
     """Create database tables"""
     Base.metadata.create_all(bind=engine)
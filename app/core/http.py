@@ -0,0 +1,29 @@
+import httpx
+from fastapi import Request
+
+from app.core.config import settings
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Create the shared, pooled client used for PokeAPI calls"""
+    return httpx.AsyncClient(
+        http2=settings.pokeapi_http2,
+        limits=httpx.Limits(
+            max_connections=settings.pokeapi_max_connections,
+            max_keepalive_connections=settings.pokeapi_max_keepalive_connections,
+            keepalive_expiry=settings.pokeapi_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            settings.pokeapi_timeout, connect=settings.pokeapi_connect_timeout
+        ),
+    )
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Get the application-scoped PokeAPI client"""
+    client = getattr(request.app.state, "http_client", None)
+    if client is None:
+        # The lifespan hook did not run (e.g. TestClient used without a
+        # context manager), so create the client lazily.
+        client = request.app.state.http_client = create_http_client()
+    return client
@@ -0,0 +1,371 @@
+import gzip
+import hashlib
+import zlib
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.security import load_principal, principal_cache, verify_access_token
+
+try:
+    import brotli  # type: ignore[import-untyped]
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Serialized responses keyed by path and normalized query string. Bodies do
+# not depend on the caller, so entries are shared between users.
+response_cache = TTLCache(
+    maxsize=settings.response_cache_max_entries,
+    ttl=settings.response_cache_ttl_seconds,
+)
+
+
+# Request state key for the callback run when a cached response is reused
+ON_CACHED_HIT = "response_cache_on_hit"
+
+
+def on_cached_hit(request: Request, callback: Callable[[], None]) -> None:
+    """Run callback each time the response cache answers for this response
+
+    Handlers only run on cache misses, so per-request bookkeeping such as
+    popularity counters is replayed this way for the requests, 304s
+    included, that the cache answers on its own.
+    """
+    setattr(request.state, ON_CACHED_HIT, callback)
+
+
+class CachedResponse:
+    """A complete 200 response as sent to the client"""
+
+    def __init__(
+        self,
+        headers: List[Tuple[bytes, bytes]],
+        body: bytes,
+        on_hit: Optional[Callable[[], None]] = None,
+    ):
+        self.etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.headers = MutableHeaders(raw=list(headers))
+        self.headers["content-length"] = str(len(body))
+        self.headers["etag"] = self.etag
+        self.headers["cache-control"] = settings.response_cache_control
+        self.body = body
+        self.encoded: Dict[str, bytes] = {}
+        self.on_hit = on_hit
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """Each content coding is its own representation with its own ETag"""
+        if encoding is None:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    def body_for(self, encoding: Optional[str]) -> bytes:
+        """The body in the given coding, compressed once per entry"""
+        if encoding is None:
+            return self.body
+        if encoding not in self.encoded:
+            self.encoded[encoding] = compress(self.body, encoding)
+        return self.encoded[encoding]
+
+
+def etag_matches(if_none_match: Optional[str], *etags: str) -> bool:
+    """Weak comparison of an If-None-Match header against etags"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") in etags:
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Content coding the client ranks highest, brotli over gzip on ties"""
+    if not accept_encoding or not settings.compression_enabled:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    def rank(coding: str) -> float:
+        return accepted.get(coding, accepted.get("*", 0.0))
+
+    codings = ("br", "gzip") if brotli is not None else ("gzip",)
+    # max() returns the first of equal qualities, so ties go to brotli
+    coding = max(codings, key=rank)
+    return coding if rank(coding) > 0 else None
+
+
+def is_compressible_type(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type: str = headers.get("content-type", "")
+    return content_type.startswith(tuple(settings.compression_media_types))
+
+
+def is_compressible(headers: Headers, body: bytes) -> bool:
+    if len(body) < settings.compression_min_size:
+        return False
+    return is_compressible_type(headers)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        compressed: bytes = brotli.compress(
+            body, quality=settings.compression_brotli_quality
+        )
+        return compressed
+    # A fixed mtime keeps the output, and so the ETag, stable
+    return gzip.compress(body, compresslevel=settings.compression_gzip_level, mtime=0)
+
+
+class StreamCompressor:
+    """Compress a streamed body chunk by chunk
+
+    Each chunk is flushed, so that a line of NDJSON reaches the client as
+    soon as the handler sends it rather than when the buffer fills.
+    """
+
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        self._compressor: Any
+        if encoding == "br":
+            self._compressor = brotli.Compressor(
+                quality=settings.compression_brotli_quality
+            )
+        else:
+            # wbits 31 writes a gzip header and trailer around the deflate data
+            self._compressor = zlib.compressobj(
+                settings.compression_gzip_level, zlib.DEFLATED, 31
+            )
+
+    def compress(self, chunk: bytes) -> bytes:
+        compressed: bytes
+        if self.encoding == "br":
+            compressed = self._compressor.process(chunk) + self._compressor.flush()
+        else:
+            compressed = self._compressor.compress(chunk)
+            compressed += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return compressed
+
+    def finish(self) -> bytes:
+        compressed: bytes
+        if self.encoding == "br":
+            compressed = self._compressor.finish()
+        else:
+            compressed = self._compressor.flush()
+        return compressed
+
+
+def cache_key(scope: Scope) -> Tuple[str, str]:
+    query = parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+    return scope["path"], urlencode(sorted(query))
+
+
+class ResponseCacheMiddleware:
+    """Serve cacheable GET responses from memory and answer conditional GETs
+
+    Only authenticated requests are cached. Before a cached body is served
+    the bearer token's user is resolved as get_current_user() does, from the
+    principal cache or the database, so deleted and deactivated users are
+    turned away; their requests go to the handler, which answers 401.
+    Responses other than 200 application/json, and those marked
+    Cache-Control: no-store, pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, cache: TTLCache = response_cache):
+        self.app = app
+        self.cache = cache
+
+    def is_cacheable(self, scope: Scope) -> bool:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return False
+        if not settings.response_cache_enabled:
+            return False
+        path: str = scope["path"]
+        return path.startswith(tuple(settings.response_cache_paths))
+
+    async def is_authorized(self, scope: Scope) -> bool:
+        """Whether the bearer token belongs to an active user"""
+        scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+        username = verify_access_token(token) if scheme.lower() == "bearer" else None
+        if username is None:
+            return False
+        if principal_cache.get(username) is not None:
+            return True
+
+        # Open the session the handlers would get, dependency overrides included
+        app = scope.get("app")
+        overrides = getattr(app, "dependency_overrides", {})
+        get_db = overrides.get(get_async_db, get_async_db)
+        async with asynccontextmanager(get_db)() as db:
+            return await load_principal(username, db) is not None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.is_cacheable(scope) or not await self.is_authorized(scope):
+            await self.app(scope, receive, send)
+            return
+
+        key = cache_key(scope)
+        entry = self.cache.get(key)
+        if entry is None:
+            entry = await self.fetch(scope, receive, send)
+            if entry is None:
+                return
+            self.cache.set(key, entry)
+        elif entry.on_hit is not None:
+            entry.on_hit()
+
+        await self.send_cached(scope, entry, send)
+
+    async def fetch(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> Optional[CachedResponse]:
+        """Run the handler, buffering the response if it can be cached"""
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def capture(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] == 200
+                    and headers.get("content-type", "").startswith("application/json")
+                    and "no-store" not in headers.get("cache-control", "")
+                ):
+                    start = message
+                    return
+                passthrough = True
+
+            if passthrough:
+                await send(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        state = scope.setdefault("state", {})
+        await self.app(scope, receive, capture)
+
+        if passthrough or start is None:
+            return None
+        return CachedResponse(
+            start["headers"], b"".join(chunks), on_hit=state.get(ON_CACHED_HIT)
+        )
+
+    async def send_cached(
+        self, scope: Scope, entry: CachedResponse, send: Send
+    ) -> None:
+        request_headers = Headers(scope=scope)
+        encoding = None
+        if is_compressible(entry.headers, entry.body):
+            encoding = choose_encoding(request_headers.get("accept-encoding"))
+        etag = entry.etag_for(encoding)
+
+        headers = MutableHeaders()
+        headers["etag"] = etag
+        headers["cache-control"] = entry.headers["cache-control"]
+        headers["vary"] = "Accept-Encoding"
+        # Any coding of the body validates, the content is the same
+        if etag_matches(
+            request_headers.get("if-none-match"), etag, entry.etag_for(None)
+        ):
+            await send(
+                {"type": "http.response.start", "status": 304, "headers": headers.raw}
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = entry.body_for(encoding)
+        headers = MutableHeaders(raw=list(entry.headers.raw))
+        headers["etag"] = etag
+        headers["content-length"] = str(len(body))
+        headers.add_vary_header("Accept-Encoding")
+        if encoding:
+            headers["content-encoding"] = encoding
+        await send(
+            {"type": "http.response.start", "status": 200, "headers": headers.raw}
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+class CompressionMiddleware:
+    """Compress responses above a size threshold with brotli or gzip
+
+    Responses that already carry a Content-Encoding, such as those served
+    from the response cache with a precompressed body, pass through
+    untouched. Streamed responses of a compressible type are compressed as
+    they are sent, whatever their size.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = None
+        if scope["type"] == "http":
+            encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        stream: Optional[StreamCompressor] = None
+
+        async def compressing(message: Message) -> None:
+            nonlocal start, stream
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if stream is not None:
+                more_body = message.get("more_body", False)
+                body = stream.compress(message.get("body", b""))
+                if not more_body:
+                    body += stream.finish()
+                await send(
+                    {"type": "http.response.body", "body": body, "more_body": more_body}
+                )
+                return
+            if start is None:
+                await send(message)
+                return
+
+            response_start, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=response_start["headers"])
+            if message.get("more_body") and is_compressible_type(headers):
+                stream = StreamCompressor(encoding)
+                if "content-length" in headers:
+                    del headers["content-length"]
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                await send(response_start)
+                await compressing(message)
+                return
+            if message.get("more_body") or not is_compressible(headers, body):
+                await send(response_start)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(response_start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, compressing)
@@ -0,0 +1,129 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, TypeVar
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+def build_password_context(
+    schemes: Sequence[str] = tuple(settings.password_schemes),
+    bcrypt_rounds: int = settings.bcrypt_rounds,
+    argon2_memory_cost: int = settings.argon2_memory_cost,
+    argon2_time_cost: int = settings.argon2_time_cost,
+    argon2_parallelism: int = settings.argon2_parallelism,
+) -> CryptContext:
+    """Build the password hashing policy"""
+    # New hashes use the first scheme; hashes made with the other schemes, or
+    # with weaker parameters, still verify but are flagged for an upgrade.
+    options: Dict[str, Any] = {}
+    if "bcrypt" in schemes:
+        options.update(bcrypt__rounds=bcrypt_rounds, bcrypt__min_rounds=bcrypt_rounds)
+    if "argon2" in schemes:
+        options.update(
+            argon2__memory_cost=argon2_memory_cost,
+            argon2__time_cost=argon2_time_cost,
+            argon2__parallelism=argon2_parallelism,
+        )
+    return CryptContext(schemes=list(schemes), deprecated="auto", **options)
+
+
+pwd_context = build_password_context()
+
+
+class PasswordWorkerPool:
+    """Dedicated, size-limited pool for CPU-heavy password hashing
+
+    Hashing runs on its own threads (bcrypt releases the GIL) so a login
+    storm cannot occupy the threadpool that serves every other sync
+    endpoint. Once max_pending jobs are queued or running, new ones are
+    refused with a 429 instead of piling up behind them.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password"
+        )
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run fn(*args) on the pool, or raise 429 if it is saturated"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many authentication requests, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, fn, *args
+            )
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+password_pool = PasswordWorkerPool(
+    max_workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash"""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def hash_password(password: str) -> str:
+    """Hash a password"""
+    return pwd_context.hash(password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password, returning a new hash if the stored one is outdated"""
+    verified: Tuple[bool, Optional[str]] = pwd_context.verify_and_update(
+        plain_password, hashed_password
+    )
+    return verified
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password on the password worker pool"""
+    return await password_pool.run(
+        verify_and_update_password, plain_password, hashed_password
+    )
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password worker pool"""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the password worker pool"""
+    return await password_pool.run(hash_password, password)
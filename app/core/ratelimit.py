@@ -0,0 +1,169 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict
+
+
+class TokenBucket:
+    """Process-wide request rate limit with bursts of up to ``burst`` calls
+
+    Callers reserve a token up front and, when the bucket is empty, sleep
+    until their token is due, so waiting callers are served in arrival
+    order without a queue of their own.
+    """
+
+    def __init__(
+        self, rate: float, burst: int, timer: Callable[[], float] = time.monotonic
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.timer = timer
+        self.tokens = float(burst)
+        self.updated = timer()
+        self.acquired = 0
+        self.throttled = 0
+        self.waiting = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self) -> None:
+        now = self.timer()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token, returning how long to wait before using it"""
+        self._refill()
+        self.tokens -= 1
+        self.acquired += 1
+        if self.tokens >= 0:
+            return 0.0
+        self.throttled += 1
+        delay = -self.tokens / self.rate
+        self.wait_seconds += delay
+        return delay
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        delay = self.reserve()
+        if not delay:
+            return
+        self.waiting += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # Hand the unused token back
+            self.tokens += 1
+            raise
+        finally:
+            self.waiting -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        self._refill()
+        return {
+            "rate": self.rate,
+            "tokens": round(max(self.tokens, 0.0), 2),
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "waiting": self.waiting,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+class AdaptiveLimiter:
+    """Concurrency limit tuned by AIMD on observed latency and overload
+
+    Every call that finishes within ``latency_target`` without a congestion
+    signal grows the limit by about one per limit's worth of calls; a slow
+    call or a congestion signal (429, timeout) multiplies it by
+    ``backoff``, at most once per round of calls that were already in flight
+    when it last backed off. Calls over the limit queue in arrival order.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        backoff: float = 0.5,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.timer = timer
+        self.backed_off_at = float("-inf")
+        self.in_flight = 0
+        self._waiters: Deque["asyncio.Future"] = deque()
+        self.acquired = 0
+        self.queued = 0
+        self.increases = 0
+        self.decreases = 0
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(int(self.limit), 1)
+
+    async def acquire(self) -> None:
+        """Wait for a slot; every acquire must be paired with a release"""
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            self.acquired += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the caller went away
+                self.in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        self.acquired += 1
+
+    def release(self, latency: float, congested: bool = False) -> None:
+        """Give the slot back and adjust the limit from the call's outcome"""
+        now = self.timer()
+        if congested or latency > self.latency_target:
+            # Calls that overlapped the last backoff saw the old limit
+            if now - latency >= self.backed_off_at:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.backed_off_at = now
+                self.decreases += 1
+        elif self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.increases += 1
+        self.in_flight -= 1
+        self._wake()
+
+    def abandon(self) -> None:
+        """Give the slot back unused, leaving the limit as it is"""
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "acquired": self.acquired,
+            "queued": self.queued,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
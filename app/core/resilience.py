@@ -0,0 +1,238 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.ratelimit import AdaptiveLimiter, TokenBucket
+
+
+class UpstreamUnavailable(Exception):
+    """The upstream could not be reached within the call's deadline"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamThrottled(UpstreamUnavailable):
+    """The call waited too long for our own rate or concurrency limit
+
+    Nothing was sent upstream, so this says nothing about its health and is
+    never reported to the circuit breaker or the concurrency limiter.
+    """
+
+
+class CircuitBreaker:
+    """Fail fast once an upstream keeps failing, probing again after a pause
+
+    Closed: calls go through and consecutive failures are counted. After
+    ``failure_threshold`` failures it opens and rejects calls for
+    ``reset_timeout`` seconds, then lets a single probe through (half-open).
+    The probe's outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timer = timer
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go through now"""
+        if self.state == self.OPEN:
+            if self.timer() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_started_at = self.timer()
+            return True
+        if self.state == self.HALF_OPEN:
+            # Only the probe is let through until it reports back, unless it
+            # never does (its caller was cancelled, say)
+            if self.timer() - self.probe_started_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.probe_started_at = self.timer()
+        return True
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a probe through"""
+        return max(self.reset_timeout - (self.timer() - self.opened_at), 0.0)
+
+    def release_probe(self) -> None:
+        """Let another call probe, the last one never reached the upstream"""
+        if self.state == self.HALF_OPEN:
+            self.probe_started_at = float("-inf")
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = self.timer()
+            self.trips += 1
+
+    def reset(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+def backoff_delay(
+    attempt: int, base: float, cap: float, rng: Callable[[], float] = random.random
+) -> float:
+    """Full-jitter exponential backoff before retry number attempt + 1"""
+    return rng() * min(cap, base * 2.0**attempt)
+
+
+def is_retryable(response: httpx.Response) -> bool:
+    return response.status_code == 429 or response.status_code >= 500
+
+
+class ResilientClient:
+    """GET-only view of an httpx client with deadlines, retries and a breaker
+
+    Each call gets ``deadline`` seconds in total, retries included. Transport
+    errors, timeouts, 429s and 5xx responses are retried with jittered
+    backoff while the deadline allows; only the final outcome of a call is
+    reported to the circuit breaker. When retries run out on an error
+    response, that response is returned so the caller can map it.
+
+    Every attempt first waits for the optional concurrency limiter and rate
+    limiter, for up to ``queue_timeout`` seconds; that wait does not count
+    against the deadline, and running out of it raises UpstreamThrottled.
+    Each attempt's latency is reported back to the concurrency limiter.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        breaker: CircuitBreaker,
+        deadline: float = settings.pokeapi_deadline_seconds,
+        retries: int = settings.pokeapi_retries,
+        backoff: float = settings.pokeapi_retry_backoff,
+        backoff_max: float = settings.pokeapi_retry_backoff_max,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        rate_limiter: Optional[TokenBucket] = None,
+        concurrency_limiter: Optional[AdaptiveLimiter] = None,
+        queue_timeout: float = settings.pokeapi_queue_timeout_seconds,
+    ):
+        self.client = client
+        self.breaker = breaker
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.queue_timeout = queue_timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(
+                "Circuit open", retry_after=self.breaker.retry_after()
+            )
+
+        # Only time spent on the upstream and backing off uses up the budget
+        remaining = self.deadline
+        response = None
+        for attempt in range(self.retries + 1):
+            try:
+                response, elapsed = await self.send(url, remaining, **kwargs)
+            except UpstreamThrottled:
+                # Nothing reached the upstream; a half-open probe hands over
+                self.breaker.release_probe()
+                raise
+            remaining -= elapsed
+            if response is not None and not is_retryable(response):
+                self.breaker.record_success()
+                return response
+
+            if attempt == self.retries:
+                break
+            delay = backoff_delay(attempt, self.backoff, self.backoff_max)
+            if delay >= remaining:
+                break
+            await self.sleep(delay)
+            remaining -= delay
+
+        self.breaker.record_failure()
+        if response is not None:
+            return response
+        raise UpstreamUnavailable("Upstream timed out")
+
+    async def acquire(self) -> None:
+        """Wait for a concurrency slot, then a rate token"""
+        limiter = self.concurrency_limiter
+        if limiter is not None:
+            await limiter.acquire()
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+        except BaseException:
+            if limiter is not None:
+                limiter.abandon()
+            raise
+
+    async def send(
+        self, url: str, timeout: float, **kwargs: Any
+    ) -> Tuple[Optional[httpx.Response], float]:
+        """A single attempt within the limits, and the seconds it spent upstream
+
+        The response is None when the attempt timed out or failed to connect.
+        """
+        try:
+            await asyncio.wait_for(self.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise UpstreamThrottled("Too many calls queued for PokeAPI")
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        outcome: Optional[bool] = None
+        response = None
+        try:
+            response = await asyncio.wait_for(
+                self.client.get(url, **kwargs), max(timeout, 0.0)
+            )
+            outcome = is_retryable(response)
+        except (httpx.TransportError, asyncio.TimeoutError):
+            outcome = True
+        finally:
+            elapsed = loop.time() - started
+            limiter = self.concurrency_limiter
+            if limiter is not None:
+                if outcome is None:
+                    # Cancelled by our caller, not a verdict on the upstream
+                    limiter.abandon()
+                else:
+                    limiter.release(elapsed, congested=outcome)
+        return response, elapsed
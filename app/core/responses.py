@@ -0,0 +1,20 @@
+from typing import Any
+
+import pydantic_core
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+
+class PydanticJSONResponse(JSONResponse):
+    """JSON response serialized by pydantic-core straight to bytes
+
+    Handlers that return an instance with a model as content skip FastAPI's
+    response validation and serialization entirely; the model is already
+    valid, so only the Rust serializer runs. Any other content goes through
+    pydantic_core.to_json rather than json.dumps.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return pydantic_core.to_json(content)
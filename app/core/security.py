@@ -1,28 +1,28 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.database import get_db
-from app.schemas.user import TokenData
+from app.core.database import get_async_db
+from app.schemas.user import User as UserSchema
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+if TYPE_CHECKING:
+    from app.models.user import User
 
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
-def hash_password(password: str) -> str:
-    """Hash a password"""
-    return pwd_context.hash(password)
+# Authenticated users keyed by token subject, so that most requests skip the
+# users table entirely. Entries are dropped when a profile changes.
+principal_cache = TTLCache(
+    maxsize=settings.principal_cache_max_entries,
+    ttl=settings.principal_cache_ttl_seconds,
+)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -40,9 +40,43 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-):
+def verify_access_token(token: str) -> Optional[str]:
+    """Subject of a well-signed, unexpired token, or None"""
+    try:
+        payload = jwt.decode(
+            token, settings.secret_key, algorithms=[settings.algorithm]
+        )
+    except JWTError:
+        return None
+    subject: Optional[str] = payload.get("sub")
+    return subject
+
+
+def invalidate_principal(username: str) -> None:
+    """Forget the cached principal for username"""
+    principal_cache.delete(username)
+
+
+async def load_principal(username: str, db: AsyncSession) -> Optional[UserSchema]:
+    """Active user with this username, from the principal cache or the DB"""
+    principal: Optional[UserSchema] = principal_cache.get(username)
+    if principal is not None:
+        return principal
+
+    from app.models.user import User
+
+    user = await db.scalar(select(User).filter(User.username == username))
+    if user is None or not user.is_active:
+        return None
+
+    principal = UserSchema.model_validate(user)
+    principal_cache.set(username, principal)
+    return principal
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> UserSchema:
     """Get current user from JWT token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,14 +91,28 @@ def get_current_user(
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
     except JWTError:
                 raise credentials_exception
     
+    principal = await load_principal(username, db)
+    if principal is None:
+        raise credentials_exception
+    return principal
+
+
+async def get_current_db_user(
+    current_user: UserSchema = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+) -> "User":
+    """Load the current user's row, for endpoints that modify it"""
     from app.models.user import User
 
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = await db.get(User, current_user.id)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
     return user
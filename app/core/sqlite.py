@@ -0,0 +1,125 @@
+import asyncio
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy import Engine, Result, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Executable
+
+from app.core.config import settings
+
+
+def sqlite_pragmas() -> dict:
+    """Connection pragmas for the tuned SQLite profile, from settings"""
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "mmap_size": settings.sqlite_mmap_size,
+        # Negative sizes are in KiB rather than pages
+        "cache_size": -settings.sqlite_cache_size_kib,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+    }
+
+
+def apply_sqlite_pragmas(engine: Engine) -> None:
+    """Run the SQLite pragmas on every new connection of a sync engine"""
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in sqlite_pragmas().items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+
+
+class SQLiteWriter:
+    """FIFO queue letting one session at a time hold SQLite's write lock
+
+    SQLite allows a single writer per database. Queueing writers here means
+    they wait on an asyncio.Lock instead of spinning on the busy timeout.
+    """
+
+    def __init__(self) -> None:
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+        self.waited = 0
+
+    async def acquire(self) -> None:
+        if self._lock.locked():
+            self.waited += 1
+        await self._lock.acquire()
+        self.acquired += 1
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "busy": self._lock.locked(),
+        }
+
+
+sqlite_writer = SQLiteWriter()
+
+
+class SerializedWriteSession(AsyncSession):
+    """AsyncSession that joins the writer queue before its first write
+
+    pysqlite only opens a transaction for DML, so the slot is taken at the
+    first INSERT/UPDATE/DELETE or pending flush and held until the
+    transaction ends. Reads never wait.
+    """
+
+    writer: SQLiteWriter = sqlite_writer
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._holds_writer = False
+
+    async def _join_writer(self) -> None:
+        if not self._holds_writer:
+            await self.writer.acquire()
+            self._holds_writer = True
+
+    def _leave_writer(self) -> None:
+        if self._holds_writer:
+            self._holds_writer = False
+            self.writer.release()
+
+    def _has_pending_changes(self) -> bool:
+        return bool(self.new or self.dirty or self.deleted)
+
+    async def execute(
+        self, statement: Executable, *args: Any, **kwargs: Any
+    ) -> Result[Any]:
+        if getattr(statement, "is_dml", False):
+            await self._join_writer()
+        return await super().execute(statement, *args, **kwargs)
+
+    async def flush(self, objects: Optional[Sequence[Any]] = None) -> None:
+        if self._has_pending_changes():
+            await self._join_writer()
+        await super().flush(objects)
+
+    async def commit(self) -> None:
+        if self._has_pending_changes():
+            await self._join_writer()
+        try:
+            await super().commit()
+        finally:
+            self._leave_writer()
+
+    async def rollback(self) -> None:
+        try:
+            await super().rollback()
+        finally:
+            self._leave_writer()
+
+    async def close(self) -> None:
+        try:
+            await super().close()
+        finally:
+            self._leave_writer()
@@ -1,17 +1,103 @@
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from typing import Any, Dict
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.datastructures import Default
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import async_engine, async_read_engine, engine, Base
+from app.core.http import create_http_client
+from app.core.middleware import (
+    CompressionMiddleware,
+    ResponseCacheMiddleware,
+    response_cache,
+)
+from app.core.passwords import password_pool
+from app.core.resilience import backoff_delay
+from app.core.responses import PydanticJSONResponse
+from app.core.sqlite import sqlite_writer
 from app.routers import auth, pokemon, users, favorites
+from app.services import pokeapi
+from app.services.pokedex import LocalPokedex
+from app.services.pokemon_cache import create_pokemon_cache, get_pokemon_cache
+from app.services.filters import PokemonFilterIndex, refresh_filter_index
+from app.services.search import NameIndex, refresh_name_index
+
+
+async def refresh_catalog_indexes(app: FastAPI) -> bool:
+    """Bring the in-memory search and filter indexes in line with the catalog
+
+    Returns whether the search index could be loaded.
+    """
+    loaded = await refresh_name_index(
+        app.state.name_index,
+        pokeapi.create_upstream_client(app.state.http_client),
+        app.state.local_pokedex,
+    )
+    await refresh_filter_index(app.state.filter_index, app.state.local_pokedex)
+    return loaded
+
+
+async def keep_catalog_indexes_fresh(app: FastAPI) -> None:
+    # Search answers 503 until the first load, so that one is retried soon
+    attempt = 0
+    while not await refresh_catalog_indexes(app):
+        await asyncio.sleep(
+            backoff_delay(
+                attempt,
+                settings.pokemon_search_retry_backoff,
+                settings.pokemon_search_retry_backoff_max,
+            )
+        )
+        # Past the cap the exponent no longer matters
+        attempt = min(attempt + 1, 32)
+    while True:
+        await asyncio.sleep(settings.pokemon_search_refresh_seconds)
+        await refresh_catalog_indexes(app)
+
+
+async def keep_hit_counts_flushed(app: FastAPI) -> None:
+    while True:
+        await asyncio.sleep(settings.pokemon_hits_flush_seconds)
+        await app.state.pokemon_cache.flush_hits()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
-    yield
+    app.state.http_client = create_http_client()
+    app.state.pokemon_cache = create_pokemon_cache()
+    app.state.local_pokedex = LocalPokedex()
+    app.state.name_index = NameIndex()
+    app.state.filter_index = PokemonFilterIndex()
+    # The indexes are first loaded in the background too, so startup is not
+    # held up by PokeAPI; searches return nothing until they are filled
+    background = [
+        asyncio.create_task(keep_catalog_indexes_fresh(app)),
+        asyncio.create_task(keep_hit_counts_flushed(app)),
+    ]
+    if settings.pokemon_source == "pokeapi":
+        # Startup is not held up waiting for PokeAPI
+        background.append(
+            asyncio.create_task(
+                pokeapi.warm_popular_pokemon(
+                    pokeapi.create_upstream_client(app.state.http_client),
+                    app.state.pokemon_cache,
+                )
+            )
+        )
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        await app.state.pokemon_cache.flush_hits()
+        await app.state.http_client.aclose()
+        await async_engine.dispose()
+        if async_read_engine is not async_engine:
+            await async_read_engine.dispose()
 
 
 app = FastAPI(
@@ -19,8 +105,13 @@ app = FastAPI(
     description="A FastAPI application for Pokemon data and user favorites",
     version="1.0.0",
     lifespan=lifespan,
+    # Wrapped in Default so routes with a response_model keep FastAPI's own
+    # direct-to-bytes serialization; everything else renders through pydantic
+    default_response_class=Default(PydanticJSONResponse),
 )
 
+app.add_middleware(ResponseCacheMiddleware)
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -45,6 +136,20 @@ async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
 
+@app.get("/metrics")
+async def metrics(request: Request) -> Dict[str, Dict[str, Any]]:
+    return {
+        "pokemon_cache": get_pokemon_cache(request).stats(),
+        "response_cache": response_cache.stats(),
+        "pokemon_singleflight": pokeapi.upstream_flights.stats(),
+        "pokeapi_breaker": pokeapi.upstream_breaker.stats(),
+        "pokeapi_rate_limit": pokeapi.upstream_rate_limiter.stats(),
+        "pokeapi_concurrency": pokeapi.upstream_concurrency.stats(),
+        "password_pool": password_pool.stats(),
+        "sqlite_writer": sqlite_writer.stats(),
+    }
+
+
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
     return JSONResponse(status_code=404, content={"detail": "Resource not found"})
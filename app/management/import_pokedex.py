@@ -0,0 +1,113 @@
+"""Import the Pokemon catalog into the local pokemon table.
+
+Usage:
+    python -m app.management.import_pokedex
+    python -m app.management.import_pokedex --source https://pokeapi.co/api/v2
+    python -m app.management.import_pokedex --source ./fixtures/pokemon
+
+The source is either a PokeAPI-compatible base URL or a directory of
+PokeAPI ``/pokemon/{id}`` JSON payloads (searched recursively). When
+POKEMON_CATALOG_PATH is set, the catalog file is rebuilt afterwards and
+running workers map the new one on their next refresh.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, engine
+from app.core.http import create_http_client
+from app.schemas.task import Pokemon
+from app.services.catalog import build_catalog_file
+from app.services.pokeapi import parse_pokemon
+from app.services.pokedex import LocalPokedex, save_pokemon
+
+
+def load_directory(directory: Path) -> List[Pokemon]:
+    """Parse every Pokemon payload found under directory"""
+    pokemon = []
+    for path in sorted(directory.rglob("*.json")):
+        payload = json.loads(path.read_text())
+        # Skip list pages and other resources that share the directory
+        if not isinstance(payload, dict) or "sprites" not in payload:
+            continue
+        pokemon.append(parse_pokemon(payload))
+    return pokemon
+
+
+async def fetch_catalog(base_url: str, concurrency: int) -> AsyncIterator[Pokemon]:
+    """Yield every Pokemon listed by a PokeAPI-compatible server"""
+    async with create_http_client() as client:
+        response = await client.get(
+            f"{base_url.rstrip('/')}/pokemon", params={"limit": 100000, "offset": 0}
+        )
+        response.raise_for_status()
+        urls = [result["url"] for result in response.json()["results"]]
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(url: str) -> Optional[Pokemon]:
+            async with semaphore:
+                detail = await client.get(url)
+            if detail.status_code != 200:
+                print(f"Skipping {url}: HTTP {detail.status_code}", file=sys.stderr)
+                return None
+            return parse_pokemon(detail.json())
+
+        for pending in asyncio.as_completed([fetch(url) for url in urls]):
+            pokemon = await pending
+            if pokemon is not None:
+                yield pokemon
+
+
+async def import_pokedex(source: str, concurrency: int, batch_size: int) -> int:
+    """Import the catalog from source, returning the number of Pokemon written"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if Path(source).is_dir():
+            return save_pokemon(db, load_directory(Path(source)))
+
+        written = 0
+        batch = []
+        async for pokemon in fetch_catalog(source, concurrency):
+            batch.append(pokemon)
+            if len(batch) >= batch_size:
+                written += save_pokemon(db, batch)
+                batch = []
+        return written + save_pokemon(db, batch)
+    finally:
+        db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--source",
+        default=settings.pokeapi_base_url,
+        help="PokeAPI-compatible base URL or directory of JSON payloads",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.pokeapi_list_concurrency
+    )
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    written = asyncio.run(
+        import_pokedex(args.source, args.concurrency, args.batch_size)
+    )
+    print(f"Imported {written} Pokemon from {args.source}")
+
+    if settings.pokemon_catalog_path:
+        size = asyncio.run(
+            build_catalog_file(LocalPokedex(), settings.pokemon_catalog_path)
+        )
+        print(f"Wrote {size} Pokemon to {settings.pokemon_catalog_path}")
+
+
+if __name__ == "__main__":
+    main()
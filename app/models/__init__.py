@@ -1,4 +1,5 @@
 from .user import User
 from .task import Favorite
+from .pokemon import Pokemon, PokemonCacheEntry
 
-__all__ = ["User", "Favorite"]
+__all__ = ["User", "Favorite", "Pokemon", "PokemonCacheEntry"]
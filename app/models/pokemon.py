@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+
+from app.core.database import Base
+
+
+class Pokemon(Base):
+    __tablename__ = "pokemon"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, index=True, nullable=False)
+    height = Column(Integer, nullable=False)
+    weight = Column(Integer, nullable=False)
+    types = Column(JSON, nullable=False)
+    abilities = Column(JSON, nullable=False)
+    sprite_url = Column(String(255), nullable=True)
+
+
+class PokemonCacheEntry(Base):
+    __tablename__ = "pokemon_cache"
+
+    pokemon_id = Column(Integer, primary_key=True)
+    name = Column(String(100), unique=True, index=True, nullable=False)
+    data = Column(JSON, nullable=False)
+    fetched_at = Column(DateTime, nullable=False)
+    # Detail requests served, used to pick the ids warmed at startup
+    hits = Column(Integer, nullable=False, default=0, server_default="0")
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -13,6 +14,33 @@ class Favorite(Base):
     pokemon_id = Column(Integer, nullable=False)
     pokemon_name = Column(String(100), nullable=False)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # SQLite keeps CURRENT_TIMESTAMP at second precision; storing bound values
+    # the same way keeps (created_at, id) keyset comparisons consistent.
+    created_at = Column(
+        DateTime(timezone=True).with_variant(
+            sqlite.DATETIME(truncate_microseconds=True), "sqlite"
+        ),
+        server_default=func.now(),
+    )
 
     user = relationship("User", back_populates="favorites")
+
+    __table_args__ = (
+        # One row per (user, pokemon); also serves the per-Pokemon lookups
+        Index(
+            "uq_favorites_user_pokemon",
+            "user_id",
+            "pokemon_id",
+            unique=True,
+            postgresql_include=["is_active"],
+        ),
+        # Partial index over active favorites in listing order
+        Index(
+            "ix_favorites_user_active_created",
+            "user_id",
+            "created_at",
+            "id",
+            sqlite_where=is_active == True,
+            postgresql_where=is_active == True,
+        ),
+    )
@@ -1,60 +1,106 @@
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Iterable
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-
-from app.core.database import get_db
-from app.core.security import (
-    create_access_token,
-    hash_password,
-    verify_password,
-    get_current_user,
-)
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_db
+from app.core.passwords import hash_password_async, verify_and_update_password_async
+from app.core.security import create_access_token, get_current_user
 from app.core.config import settings
+from app.core.resilience import ResilientClient
+from app.models.task import Favorite
 from app.models.user import User
 from app.schemas.user import UserCreate, User as UserSchema, Token, UserLogin
+from app.services.pokeapi import get_upstream_client, warm_pokemon
+from app.services.pokemon_cache import PokemonCache, get_pokemon_cache
 
 router = APIRouter()
 
 
+async def warm_favorites(
+    background_tasks: BackgroundTasks,
+    db: AsyncSession,
+    user: User,
+    client: ResilientClient,
+    cache: PokemonCache,
+) -> None:
+    """Load the user's favorite Pokemon into the cache after the response"""
+    if (
+        not settings.pokemon_prefetch_favorites_on_login
+        or settings.pokemon_source != "pokeapi"
+    ):
+        return
+    pokemon_ids: Iterable[int] = await db.scalars(
+        select(Favorite.pokemon_id)
+        .filter(Favorite.user_id == user.id, Favorite.is_active.is_(True))
+        .limit(settings.pokemon_warmup_count)
+    )
+    pokemon_urls = [
+        f"{settings.pokeapi_base_url}/pokemon/{pokemon_id}"
+        for pokemon_id in pokemon_ids
+    ]
+    if pokemon_urls:
+        background_tasks.add_task(warm_pokemon, client, cache, pokemon_urls)
+
+
 @router.post(
     "/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED
 )
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await db.scalar(select(User).filter(User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Check username
-    db_user = db.query(User).filter(User.username == user.username).first()
+    db_user = await db.scalar(select(User).filter(User.username == user.username))
     if db_user:
         raise HTTPException(status_code=400, detail="Username already taken")
 
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password_async(user.password)
     db_user = User(
         username=user.username, email=user.email, hashed_password=hashed_password
     )
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
 @router.post("/login", response_model=Token)
-def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login_user(
+    user_credentials: UserLogin,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    client: ResilientClient = Depends(get_upstream_client),
+    cache: PokemonCache = Depends(get_pokemon_cache),
+):
     """Login user and return access token"""
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    user = await db.scalar(select(User).filter(User.email == user_credentials.email))
 
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await verify_and_update_password_async(
+            user_credentials.password, user.hashed_password
+        )
+    if user is None or not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if new_hash:
+        # Upgrade hashes made under an older hashing policy
+        user.hashed_password = new_hash
+        await db.commit()
+
+    await warm_favorites(background_tasks, db, user, client, cache)
+
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -64,20 +110,35 @@ def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    client: ResilientClient = Depends(get_upstream_client),
+    cache: PokemonCache = Depends(get_pokemon_cache),
 ):
     """OAuth2 compatible token login"""
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await db.scalar(select(User).filter(User.username == form_data.username))
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await verify_and_update_password_async(
+            form_data.password, user.hashed_password
+        )
+    if user is None or not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if new_hash:
+        # Upgrade hashes made under an older hashing policy
+        user.hashed_password = new_hash
+        await db.commit()
+
+    await warm_favorites(background_tasks, db, user, client, cache)
+
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -87,6 +148,6 @@ def login_for_access_token(
 
 
 @router.get("/me", response_model=UserSchema)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: UserSchema = Depends(get_current_user)):
     """Get current user information"""
     return current_user
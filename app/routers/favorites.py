@@ -1,50 +1,260 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import Insert, and_, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_async_read_db
+from app.core.responses import PydanticJSONResponse
 from app.core.security import get_current_user
-from app.models.user import User
 from app.models.task import Favorite
+from app.schemas.user import User as UserSchema
 from app.schemas.task import (
     FavoriteCreate,
     Favorite as FavoriteSchema,
     FavoriteResponse,
+    FavoriteBatchCreate,
+    FavoriteBatchIds,
+    FavoriteBatchResult,
+    FavoriteBatchResponse,
+    FavoriteCheckResponse,
 )
 
 router = APIRouter()
 
+# Dialects whose INSERT supports ON CONFLICT ... DO UPDATE
+UPSERT_INSERTS: Dict[str, Callable[[Any], Union[sqlite.Insert, postgresql.Insert]]] = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def encode_cursor(favorite: Favorite) -> str:
+    """Opaque cursor pointing just past favorite in listing order"""
+    position = [favorite.created_at.isoformat(), favorite.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor"""
+    try:
+        created_at, favorite_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(created_at), int(favorite_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 @router.get("/", response_model=FavoriteResponse)
-def get_user_favorites(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def get_user_favorites(
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user: UserSchema = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    """Get current user's favorite Pokemon"""
+    """Get current user's favorite Pokemon, newest first, one page at a time"""
+    active = (Favorite.user_id == current_user.id, Favorite.is_active == True)
+
+    query = select(Favorite).filter(*active)
+    if cursor:
+        created_at, favorite_id = decode_cursor(cursor)
+        # The declarative models are untyped; mypy sees bools here
+        query = query.filter(
+            or_(
+                Favorite.created_at < created_at,  # type: ignore[arg-type]
+                and_(
+                    Favorite.created_at == created_at,
+                    Favorite.id < favorite_id,  # type: ignore[arg-type]
+                ),
+            )
+        )
+    # Fetch one extra row to learn whether another page follows
     favorites = (
-        db.query(Favorite)
-        .filter(Favorite.user_id == current_user.id, Favorite.is_active == True)
-        .all()
+        await db.scalars(
+            query.order_by(Favorite.created_at.desc(), Favorite.id.desc()).limit(
+                limit + 1
+            )
+        )
+    ).all()
+
+    next_cursor = None
+    if len(favorites) > limit:
+        favorites = favorites[:limit]
+        next_cursor = encode_cursor(favorites[-1])
+
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count(Favorite.id)).filter(*active))
+
+    return PydanticJSONResponse(
+        FavoriteResponse(favorites=favorites, total=total, next_cursor=next_cursor)
+    )
+
+
+def upsert_favorites(db: AsyncSession) -> Insert:
+    """INSERT of favorites that reactivates rows added since they were read
+
+    The rows to create are chosen before the write lock is taken, so another
+    request may insert one of them first. Where the dialect supports it the
+    conflict becomes an update; elsewhere it surfaces as an IntegrityError.
+    """
+    upsert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if upsert is None:
+        return insert(Favorite)
+    statement = upsert(Favorite)
+    return statement.on_conflict_do_update(
+        index_elements=[Favorite.user_id, Favorite.pokemon_id],
+        set_={"is_active": True},
+    )
+
+
+@router.post("/batch", response_model=FavoriteBatchResponse)
+async def add_many_pokemon_to_favorites(
+    batch: FavoriteBatchCreate,
+    current_user: UserSchema = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+) -> FavoriteBatchResponse:
+    """Add many Pokemon to user's favorites in a single transaction"""
+    # Later duplicates in the request are ignored
+    requested: Dict[int, FavoriteCreate] = {}
+    for item in batch.favorites:
+        requested.setdefault(item.pokemon_id, item)
+
+    rows: Iterable[Tuple[int, int, bool]] = await db.execute(
+        select(Favorite.id, Favorite.pokemon_id, Favorite.is_active).filter(
+            Favorite.user_id == current_user.id,
+            Favorite.pokemon_id.in_(requested),
+        )
+    )
+    existing = {
+        pokemon_id: (favorite_id, is_active)
+        for favorite_id, pokemon_id, is_active in rows
+    }
+
+    results = []
+    reactivate = []
+    create = []
+    for pokemon_id, item in requested.items():
+        if pokemon_id not in existing:
+            create.append(
+                {
+                    "user_id": current_user.id,
+                    "pokemon_id": pokemon_id,
+                    "pokemon_name": item.pokemon_name,
+                    "is_active": True,
+                }
+            )
+            results.append(FavoriteBatchResult(pokemon_id=pokemon_id, status="added"))
+        elif existing[pokemon_id][1]:
+            results.append(
+                FavoriteBatchResult(pokemon_id=pokemon_id, status="already_favorite")
+            )
+        else:
+            reactivate.append(existing[pokemon_id][0])
+            results.append(
+                FavoriteBatchResult(pokemon_id=pokemon_id, status="reactivated")
+            )
+
+    try:
+        if reactivate:
+            await db.execute(
+                update(Favorite)
+                .where(Favorite.id.in_(reactivate))
+                .values(is_active=True)
+            )
+        if create:
+            await db.execute(upsert_favorites(db), create)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Favorites were modified concurrently, please retry",
+        )
+
+    return FavoriteBatchResponse(results=results)
+
+
+@router.post("/batch/remove", response_model=FavoriteBatchResponse)
+async def remove_many_pokemon_from_favorites(
+    batch: FavoriteBatchIds,
+    current_user: UserSchema = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+) -> FavoriteBatchResponse:
+    """Remove many Pokemon from user's favorites in a single transaction"""
+    active: Set[int] = set(
+        await db.scalars(
+            select(Favorite.pokemon_id).filter(
+                Favorite.user_id == current_user.id,
+                Favorite.pokemon_id.in_(batch.pokemon_ids),
+                Favorite.is_active == True,
+            )
+        )
     )
 
-    return FavoriteResponse(favorites=favorites, total=len(favorites))
+    if active:
+        await db.execute(
+            update(Favorite)
+            .where(
+                Favorite.user_id == current_user.id,
+                Favorite.pokemon_id.in_(active),
+            )
+            .values(is_active=False)
+        )
+        await db.commit()
+
+    return FavoriteBatchResponse(
+        results=[
+            FavoriteBatchResult(
+                pokemon_id=pokemon_id,
+                status="removed" if pokemon_id in active else "not_found",
+            )
+            for pokemon_id in dict.fromkeys(batch.pokemon_ids)
+        ]
+    )
+
+
+@router.post("/batch/check", response_model=FavoriteCheckResponse)
+async def check_many_pokemon_in_favorites(
+    batch: FavoriteBatchIds,
+    current_user: UserSchema = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> FavoriteCheckResponse:
+    """Check which of many Pokemon are in user's favorites"""
+    active: Set[int] = set(
+        await db.scalars(
+            select(Favorite.pokemon_id).filter(
+                Favorite.user_id == current_user.id,
+                Favorite.pokemon_id.in_(batch.pokemon_ids),
+                Favorite.is_active == True,
+            )
+        )
+    )
+
+    return FavoriteCheckResponse(
+        results={pokemon_id: pokemon_id in active for pokemon_id in batch.pokemon_ids}
+    )
 
 
 @router.post(
     "/{pokemon_id}", response_model=FavoriteSchema, status_code=status.HTTP_201_CREATED
 )
-def add_pokemon_to_favorites(
+async def add_pokemon_to_favorites(
     pokemon_id: int,
     pokemon_name: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: UserSchema = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Add a Pokemon to user's favorites"""
     # Check if already in favorites
-    existing_favorite = (
-        db.query(Favorite)
-        .filter(Favorite.user_id == current_user.id, Favorite.pokemon_id == pokemon_id)
-        .first()
+    existing_favorite = await db.scalar(
+        select(Favorite).filter(
+            Favorite.user_id == current_user.id, Favorite.pokemon_id == pokemon_id
+        )
     )
 
     if existing_favorite:
@@ -55,8 +265,8 @@ def add_pokemon_to_favorites(
         else:
             # Reactivate the favorite
             existing_favorite.is_active = True
-            db.commit()
-            db.refresh(existing_favorite)
+            await db.commit()
+            await db.refresh(existing_favorite)
             return existing_favorite
 
     # Create new favorite
@@ -65,50 +275,64 @@ def add_pokemon_to_favorites(
     )
 
     db.add(favorite)
-    db.commit()
-    db.refresh(favorite)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another request added it since the check above
+        await db.rollback()
+        favorite = (
+            await db.scalars(
+                select(Favorite).filter(
+                    Favorite.user_id == current_user.id,
+                    Favorite.pokemon_id == pokemon_id,
+                )
+            )
+        ).one()
+        if favorite.is_active:
+            raise HTTPException(
+                status_code=400, detail="Pokemon is already in favorites"
+            )
+        favorite.is_active = True
+        await db.commit()
+    await db.refresh(favorite)
     return favorite
 
 
 @router.delete("/{pokemon_id}", status_code=status.HTTP_204_NO_CONTENT)
-def remove_pokemon_from_favorites(
+async def remove_pokemon_from_favorites(
     pokemon_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: UserSchema = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Remove a Pokemon from user's favorites"""
-    favorite = (
-        db.query(Favorite)
-        .filter(
+    favorite = await db.scalar(
+        select(Favorite).filter(
             Favorite.user_id == current_user.id,
             Favorite.pokemon_id == pokemon_id,
             Favorite.is_active == True,
         )
-        .first()
     )
 
     if not favorite:
         raise HTTPException(status_code=404, detail="Pokemon not found in favorites")
     
     favorite.is_active = False
-    db.commit()
+    await db.commit()
 
 
 @router.get("/check/{pokemon_id}")
-def check_pokemon_in_favorites(
+async def check_pokemon_in_favorites(
     pokemon_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: UserSchema = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """Check if a Pokemon is in user's favorites"""
-    favorite = (
-        db.query(Favorite)
-        .filter(
+    favorite = await db.scalar(
+        select(Favorite).filter(
             Favorite.user_id == current_user.id,
             Favorite.pokemon_id == pokemon_id,
             Favorite.is_active == True,
         )
-        .first()
     )
 
     return {"is_favorite": favorite is not None}
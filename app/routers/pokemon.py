@@ -1,118 +1,295 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-import httpx
+import asyncio
+from typing import AsyncIterator, Iterable, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
 
 from app.core.config import settings
+from app.core.middleware import on_cached_hit
+from app.core.resilience import ResilientClient, UpstreamUnavailable
+from app.core.responses import PydanticJSONResponse
 from app.core.security import get_current_user
-from app.models.user import User
-from app.schemas.task import Pokemon, PokemonSearchResponse
+from app.schemas.user import User as UserSchema
+from app.schemas.task import (
+    Pokemon,
+    PokemonNameMatch,
+    PokemonNameSearchResponse,
+    PokemonSearchResponse,
+)
+from app.services.filters import PokemonFilterIndex, get_filter_index
+from app.services.pokeapi import (
+    fetch_pokemon,
+    get_pokemon_detail,
+    get_upstream_client,
+    prefetch_in_background,
+    upstream_unavailable,
+)
+from app.services.pokedex import LocalPokedex, get_local_pokedex
+from app.services.pokemon_cache import PokemonCache, get_pokemon_cache
+from app.services.search import NameIndex, get_name_index
 
 router = APIRouter()
 
-POKEAPI_BASE_URL = "https://pokeapi.co/api/v2"
-
 
 @router.get("/", response_model=PokemonSearchResponse)
 async def get_pokemon_list(
+    request: Request,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
+    type: Optional[List[str]] = Query(None),
+    ability: Optional[List[str]] = Query(None),
+    min_height: Optional[int] = Query(None, ge=0),
+    max_height: Optional[int] = Query(None, ge=0),
+    min_weight: Optional[int] = Query(None, ge=0),
+    max_weight: Optional[int] = Query(None, ge=0),
+    stream: bool = False,
+    current_user: UserSchema = Depends(get_current_user),
+    client: ResilientClient = Depends(get_upstream_client),
+    cache: PokemonCache = Depends(get_pokemon_cache),
+    pokedex: LocalPokedex = Depends(get_local_pokedex),
+    filter_index: PokemonFilterIndex = Depends(get_filter_index),
 ):
-    """Get a list of Pokemon with pagination"""
-    async with httpx.AsyncClient() as client:
+    """Get a list of Pokemon with pagination, optionally filtered
+
+    With stream=true the page is sent as NDJSON, one Pokemon per line as
+    soon as its details are available, and the total in X-Total-Count.
+    """
+    # Pages are returned pre-serialized: the models are built here already,
+    # so validating them again on the way out is wasted work
+    bounds = (min_height, max_height, min_weight, max_weight)
+    if type or ability or any(bound is not None for bound in bounds):
+        if not len(filter_index):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Pokemon filters need the local Pokedex snapshot to be imported",
+            )
+        results, count = filter_index.query(
+            types=type or (),
+            abilities=ability or (),
+            min_height=min_height,
+            max_height=max_height,
+            min_weight=min_weight,
+            max_weight=max_weight,
+            limit=limit,
+            offset=offset,
+        )
+        if stream:
+            return ndjson_response(iterate(results), count)
+        return PydanticJSONResponse(
+            paginated_response(request, results, count, limit, offset)
+        )
+
+    if settings.pokemon_source == "local":
+        page = await get_local_pokemon_list(request, pokedex, limit, offset)
+        if stream:
+            return ndjson_response(iterate(page.results), page.count)
+        return PydanticJSONResponse(page)
+
+    try:
         response = await client.get(
-            f"{POKEAPI_BASE_URL}/pokemon", params={"limit": limit, "offset": offset}
+            f"{settings.pokeapi_base_url}/pokemon",
+            params={"limit": limit, "offset": offset},
         )
+    except UpstreamUnavailable as exc:
+        raise upstream_unavailable(exc)
+
+    if response.status_code != 200:
+        raise HTTPException(status_code=500, detail="Failed to fetch Pokemon data")
+
+    data = response.json()
+    pokemon_urls = [pokemon_data["url"] for pokemon_data in data["results"]]
 
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Failed to fetch Pokemon data")
+    # Most clients ask for the next page next; warm it once this one is done
+    prefetch = settings.pokemon_prefetch_next_page and offset + limit < data["count"]
 
-        data = response.json()
+    if stream:
+        pokemon = stream_pokemon_details(client, cache, pokemon_urls)
+        if prefetch:
+            pokemon = then_prefetch(pokemon, client, cache, limit, offset + limit)
+        return ndjson_response(pokemon, data["count"])
 
-        pokemon_list = []
-        for pokemon_data in data["results"]:
-            pokemon_detail = await get_pokemon_detail(pokemon_data["url"])
-            if pokemon_detail:
-                pokemon_list.append(pokemon_detail)
+    semaphore = asyncio.Semaphore(settings.pokeapi_list_concurrency)
 
-        return PokemonSearchResponse(
-            results=pokemon_list,
+    async def fetch_detail(pokemon_url: str) -> Optional[Pokemon]:
+        async with semaphore:
+            return await get_pokemon_detail(client, cache, pokemon_url)
+
+    # gather() keeps the upstream ordering; failed lookups are skipped
+    pokemon_details = await asyncio.gather(*map(fetch_detail, pokemon_urls))
+    if prefetch:
+        prefetch_in_background(client, cache, limit, offset + limit)
+
+    results = [pokemon for pokemon in pokemon_details if pokemon]
+    # A page missing some details must not be cached by anyone, us included
+    headers = (
+        {"Cache-Control": "no-store"} if len(results) < len(pokemon_urls) else None
+    )
+    return PydanticJSONResponse(
+        PokemonSearchResponse(
+            results=results,
             count=data["count"],
             next_url=data.get("next"),
             previous_url=data.get("previous"),
+        ),
+        headers=headers,
+    )
+
+
+@router.get("/search", response_model=PokemonNameSearchResponse)
+async def search_pokemon_names(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    fuzzy: bool = True,
+    current_user: UserSchema = Depends(get_current_user),
+    index: NameIndex = Depends(get_name_index),
+) -> PokemonNameSearchResponse:
+    """Search Pokemon names by prefix, falling back to fuzzy matches"""
+    if not len(index):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Pokemon search is not available until the names are loaded",
         )
+    matches = index.search(q, fuzzy=fuzzy)
+
+    return PokemonNameSearchResponse(
+        results=[
+            PokemonNameMatch(id=pokemon_id, name=name, score=score)
+            for name, pokemon_id, score in matches[offset : offset + limit]
+        ],
+        count=len(matches),
+    )
+
+
+def record_hit(request: Request, cache: PokemonCache, pokemon_id: int) -> None:
+    """Count a request for a Pokemon, and the cached responses that repeat it"""
+    cache.record_hit(pokemon_id)
+    on_cached_hit(request, lambda: cache.record_hit(pokemon_id))
 
 
 @router.get("/{pokemon_id}", response_model=Pokemon)
 async def get_pokemon(
+    request: Request,
     pokemon_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSchema = Depends(get_current_user),
+    client: ResilientClient = Depends(get_upstream_client),
+    cache: PokemonCache = Depends(get_pokemon_cache),
+    pokedex: LocalPokedex = Depends(get_local_pokedex),
 ):
     """Get detailed information about a specific Pokemon"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{POKEAPI_BASE_URL}/pokemon/{pokemon_id}")
-
-        if response.status_code == 404:
-            raise HTTPException(status_code=404, detail="Pokemon not found")
-        elif response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Failed to fetch Pokemon data")
-
-        pokemon_data = response.json()
-
-        return Pokemon(
-            id=pokemon_data["id"],
-            name=pokemon_data["name"],
-            height=pokemon_data["height"],
-            weight=pokemon_data["weight"],
-            types=[t["type"]["name"] for t in pokemon_data["types"]],
-            abilities=[a["ability"]["name"] for a in pokemon_data["abilities"]],
-            sprite_url=pokemon_data["sprites"]["front_default"],
+    if settings.pokemon_source == "local":
+        pokemon = await pokedex.get(pokemon_id)
+    else:
+        pokemon = await fetch_pokemon(
+            client, cache, f"{settings.pokeapi_base_url}/pokemon/{pokemon_id}"
         )
+        if pokemon is not None:
+            record_hit(request, cache, pokemon.id)
+    if pokemon is None:
+        raise HTTPException(status_code=404, detail="Pokemon not found")
+
+    return pokemon
 
 
 @router.post("/search/{name}", response_model=Pokemon)
 async def search_pokemon_by_name(
+    request: Request,
     name: str,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSchema = Depends(get_current_user),
+    client: ResilientClient = Depends(get_upstream_client),
+    cache: PokemonCache = Depends(get_pokemon_cache),
+    pokedex: LocalPokedex = Depends(get_local_pokedex),
 ):
     """Search for a Pokemon by name"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{POKEAPI_BASE_URL}/pokemon/{name.lower()}")
-
-        if response.status_code == 404:
-            raise HTTPException(status_code=404, detail=f"Pokemon '{name}' not found")
-        elif response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Failed to fetch Pokemon data")
-
-        pokemon_data = response.json()
-
-        return Pokemon(
-            id=pokemon_data["id"],
-            name=pokemon_data["name"],
-            height=pokemon_data["height"],
-            weight=pokemon_data["weight"],
-            types=[t["type"]["name"] for t in pokemon_data["types"]],
-            abilities=[a["ability"]["name"] for a in pokemon_data["abilities"]],
-            sprite_url=pokemon_data["sprites"]["front_default"],
+    if settings.pokemon_source == "local":
+        pokemon = await pokedex.get_by_name(name)
+    else:
+        pokemon = await fetch_pokemon(
+            client, cache, f"{settings.pokeapi_base_url}/pokemon/{name.lower()}"
         )
+        if pokemon is not None:
+            record_hit(request, cache, pokemon.id)
+    if pokemon is None:
+        raise HTTPException(status_code=404, detail=f"Pokemon '{name}' not found")
 
+    return pokemon
 
-async def get_pokemon_detail(pokemon_url: str) -> Optional[Pokemon]:
-    """Helper function to get detailed Pokemon information"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(pokemon_url)
 
-        if response.status_code != 200:
-            return None
+async def get_local_pokemon_list(
+    request: Request, pokedex: LocalPokedex, limit: int, offset: int
+) -> PokemonSearchResponse:
+    """Serve a list page from the local Pokedex snapshot"""
+    results, count = await pokedex.list_page(limit, offset)
+    return paginated_response(request, results, count, limit, offset)
 
-        pokemon_data = response.json()
 
-        return Pokemon(
-            id=pokemon_data["id"],
-            name=pokemon_data["name"],
-            height=pokemon_data["height"],
-            weight=pokemon_data["weight"],
-            types=[t["type"]["name"] for t in pokemon_data["types"]],
-            abilities=[a["ability"]["name"] for a in pokemon_data["abilities"]],
-            sprite_url=pokemon_data["sprites"]["front_default"],
+def paginated_response(
+    request: Request, results: List[Pokemon], count: int, limit: int, offset: int
+) -> PokemonSearchResponse:
+    """Build a list page with next/previous links pointing back at this API"""
+    next_url = previous_url = None
+    if offset + limit < count:
+        next_url = str(
+            request.url.include_query_params(limit=limit, offset=offset + limit)
         )
+    if offset > 0:
+        previous_url = str(
+            request.url.include_query_params(limit=limit, offset=max(offset - limit, 0))
+        )
+
+    return PokemonSearchResponse(
+        results=results, count=count, next_url=next_url, previous_url=previous_url
+    )
+
+
+async def stream_pokemon_details(
+    client: ResilientClient, cache: PokemonCache, pokemon_urls: List[str]
+) -> AsyncIterator[Pokemon]:
+    """Yield Pokemon details in the order they arrive, skipping failed lookups"""
+    semaphore = asyncio.Semaphore(settings.pokeapi_list_concurrency)
+
+    async def fetch_detail(pokemon_url: str) -> Optional[Pokemon]:
+        async with semaphore:
+            return await get_pokemon_detail(client, cache, pokemon_url)
+
+    tasks = [asyncio.ensure_future(fetch_detail(url)) for url in pokemon_urls]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            pokemon = await next_done
+            if pokemon:
+                yield pokemon
+    finally:
+        # The client went away before the page was complete
+        for task in tasks:
+            task.cancel()
+
+
+async def iterate(pokemon: Iterable[Pokemon]) -> AsyncIterator[Pokemon]:
+    for item in pokemon:
+        yield item
+
+
+def ndjson_response(pokemon: AsyncIterator[Pokemon], count: int) -> StreamingResponse:
+    """Stream Pokemon as newline-delimited JSON"""
+
+    async def lines() -> AsyncIterator[bytes]:
+        async for item in pokemon:
+            yield item.__pydantic_serializer__.to_json(item) + b"\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"X-Total-Count": str(count)},
+    )
+
+
+async def then_prefetch(
+    pokemon: AsyncIterator[Pokemon],
+    client: ResilientClient,
+    cache: PokemonCache,
+    limit: int,
+    offset: int,
+) -> AsyncIterator[Pokemon]:
+    """Pass a stream through, then prefetch the page after it"""
+    async for item in pokemon:
+        yield item
+    prefetch_in_background(client, cache, limit, offset)
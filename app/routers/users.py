@@ -1,8 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.security import get_current_user, hash_password
+from app.core.database import get_async_db
+from app.core.passwords import hash_password_async
+from app.core.security import (
+    get_current_db_user,
+    get_current_user,
+    invalidate_principal,
+)
 from app.models.user import User
 from app.schemas.user import UserUpdate, User as UserSchema
 
@@ -10,55 +16,56 @@ router = APIRouter()
 
 
 @router.get("/me", response_model=UserSchema)
-def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(
+    current_user: UserSchema = Depends(get_current_user),
+):
     """Get current user profile"""
     return current_user
 
 
 @router.put("/me", response_model=UserSchema)
-def update_user_profile(
+async def update_user_profile(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_db_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update current user profile"""
+    previous_username = str(current_user.username)
     update_data = user_update.dict(exclude_unset=True)
 
     for field, value in update_data.items():
         if field == "password":
-            hashed_password = hash_password(value)
+            hashed_password = await hash_password_async(value)
             setattr(current_user, "hashed_password", hashed_password)
         elif field == "email":
             # Check if email is already taken
-            existing_user = (
-                db.query(User)
-                .filter(User.email == value, User.id != current_user.id)
-                .first()
+            existing_user = await db.scalar(
+                select(User).filter(User.email == value, User.id != current_user.id)
             )
             if existing_user:
                 raise HTTPException(status_code=400, detail="Email already registered")
             setattr(current_user, field, value)
         elif field == "username":
             # Check if username is already taken
-            existing_user = (
-                db.query(User)
-                .filter(User.username == value, User.id != current_user.id)
-                .first()
+            existing_user = await db.scalar(
+                select(User).filter(User.username == value, User.id != current_user.id)
             )
             if existing_user:
                 raise HTTPException(status_code=400, detail="Username already taken")
             setattr(current_user, field, value)
 
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    invalidate_principal(previous_username)
     return current_user
 
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
-def deactivate_user_account(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def deactivate_user_account(
+    current_user: User = Depends(get_current_db_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Deactivate current user account"""
     current_user.is_active = False
-    db.commit()
+    await db.commit()
+    invalidate_principal(str(current_user.username))
@@ -2,9 +2,16 @@ from .user import User, UserCreate, UserUpdate, UserLogin, Token, TokenData
 from .task import (
     Pokemon,
     PokemonSearchResponse,
+    PokemonNameMatch,
+    PokemonNameSearchResponse,
     Favorite,
     FavoriteCreate,
     FavoriteResponse,
+    FavoriteBatchCreate,
+    FavoriteBatchIds,
+    FavoriteBatchResult,
+    FavoriteBatchResponse,
+    FavoriteCheckResponse,
 )
 
 __all__ = [
@@ -16,7 +23,14 @@ __all__ = [
     "TokenData",
     "Pokemon",
     "PokemonSearchResponse",
+    "PokemonNameMatch",
+    "PokemonNameSearchResponse",
     "Favorite",
     "FavoriteCreate",
     "FavoriteResponse",
+    "FavoriteBatchCreate",
+    "FavoriteBatchIds",
+    "FavoriteBatchResult",
+    "FavoriteBatchResponse",
+    "FavoriteCheckResponse",
 ]
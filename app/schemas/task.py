@@ -1,6 +1,6 @@
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class PokemonBase(BaseModel):
@@ -26,6 +26,17 @@ class PokemonSearchResponse(BaseModel):
     previous_url: Optional[str] = None
 
 
+class PokemonNameMatch(BaseModel):
+    id: int
+    name: str
+    score: float
+
+
+class PokemonNameSearchResponse(BaseModel):
+    results: List[PokemonNameMatch]
+    count: int
+
+
 class FavoriteBase(BaseModel):
     pokemon_id: int
     pokemon_name: str
@@ -47,4 +58,27 @@ class Favorite(FavoriteBase):
 
 class FavoriteResponse(BaseModel):
     favorites: List[Favorite]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class FavoriteBatchCreate(BaseModel):
+    favorites: List[FavoriteCreate] = Field(..., min_length=1, max_length=500)
+
+
+class FavoriteBatchIds(BaseModel):
+    pokemon_ids: List[int] = Field(..., min_length=1, max_length=500)
+
+
+class FavoriteBatchResult(BaseModel):
+    pokemon_id: int
+    # added, reactivated, already_favorite, removed or not_found
+    status: str
+
+
+class FavoriteBatchResponse(BaseModel):
+    results: List[FavoriteBatchResult]
+
+
+class FavoriteCheckResponse(BaseModel):
+    results: Dict[int, bool]
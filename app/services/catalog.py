@@ -0,0 +1,301 @@
+import json
+import mmap
+import os
+import sys
+import tempfile
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from starlette.concurrency import run_in_threadpool
+
+from app.schemas.task import Pokemon
+from app.services.pokedex import LocalPokedex
+
+CATALOG_MAGIC = b"PKCATLG1"
+
+# Columns are arrays while a catalog is built and memoryviews over the file
+# once it is loaded; both index and slice the same way
+IntColumn = Union["array[int]", memoryview]
+
+
+class _Vocabulary:
+    """Interned strings numbered in order of first appearance"""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.words: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for word in words:
+            self.code(word)
+
+    def code(self, word: str) -> int:
+        code = self.codes.get(word)
+        if code is None:
+            code = self.codes[word] = len(self.words)
+            self.words.append(word)
+        return code
+
+
+class _Strings:
+    """UTF-8 strings packed end to end, the ith in data[starts[i]:starts[i + 1]]"""
+
+    def __init__(self, data: Union[bytes, memoryview], starts: IntColumn):
+        self.data = data
+        self.starts = starts
+
+    @classmethod
+    def pack(cls, strings: Sequence[str]) -> "_Strings":
+        encoded = [string.encode() for string in strings]
+        starts = array("I", [0])
+        for string in encoded:
+            starts.append(starts[-1] + len(string))
+        return cls(b"".join(encoded), starts)
+
+    def __getitem__(self, position: int) -> str:
+        return str(
+            self.data[self.starts[position] : self.starts[position + 1]], "utf-8"
+        )
+
+
+class _CodeLists:
+    """Variable-length lists of vocabulary codes packed into two arrays
+
+    The codes of entry i are ``codes[starts[i]:starts[i + 1]]``.
+    """
+
+    def __init__(self, vocabulary: _Vocabulary, codes: IntColumn, starts: IntColumn):
+        self.vocabulary = vocabulary
+        self.codes = codes
+        self.starts = starts
+
+    @classmethod
+    def pack(cls, lists: Iterable[Iterable[str]]) -> "_CodeLists":
+        vocabulary = _Vocabulary()
+        codes = array("H")
+        starts = array("I", [0])
+        for words in lists:
+            codes.extend(vocabulary.code(word) for word in words)
+            starts.append(len(codes))
+        return cls(vocabulary, codes, starts)
+
+    def codes_at(self, position: int) -> IntColumn:
+        return self.codes[self.starts[position] : self.starts[position + 1]]
+
+    def words_at(self, position: int) -> List[str]:
+        words = self.vocabulary.words
+        return [words[code] for code in self.codes_at(position)]
+
+
+class PokemonCatalog:
+    """Read-only Pokemon catalog stored column by column
+
+    Numbers live in typed arrays, names in one packed UTF-8 buffer, types and
+    abilities as small integer codes into shared vocabularies, and sprite
+    URLs as a shared prefix code plus the file name. The catalog costs a few
+    dozen bytes per Pokemon instead of a model instance with its own dict
+    and strings; ``Pokemon`` objects are only built for the entries that
+    are returned.
+
+    The same columns can be saved to a file with save_catalog() and mapped
+    back read-only with load_catalog(), so processes share one copy.
+    """
+
+    ids: IntColumn
+    heights: IntColumn
+    weights: IntColumn
+    height_order: IntColumn
+    weight_order: IntColumn
+    sprite_prefix_codes: IntColumn
+
+    def __init__(self, pokemon: Iterable[Pokemon] = ()):
+        ids, heights, weights = array("i"), array("i"), array("i")
+        self.sprite_prefixes = _Vocabulary()
+        # -1 marks a Pokemon without a sprite
+        sprite_prefix_codes = array("h")
+        names: List[str] = []
+        sprite_names: List[str] = []
+        types: List[List[str]] = []
+        abilities: List[List[str]] = []
+        for item in pokemon:
+            ids.append(item.id)
+            heights.append(item.height)
+            weights.append(item.weight)
+            names.append(item.name)
+            types.append(item.types)
+            abilities.append(item.abilities)
+            if item.sprite_url is None:
+                sprite_prefix_codes.append(-1)
+                sprite_names.append("")
+            else:
+                prefix, _, name = item.sprite_url.rpartition("/")
+                sprite_prefix_codes.append(self.sprite_prefixes.code(prefix))
+                sprite_names.append(name)
+        self.ids, self.heights, self.weights = ids, heights, weights
+        self.sprite_prefix_codes = sprite_prefix_codes
+        self.types = _CodeLists.pack(types)
+        self.abilities = _CodeLists.pack(abilities)
+        self.names = _Strings.pack(names)
+        self.sprite_names = _Strings.pack(sprite_names)
+        # Positions ordered by value, for range queries
+        self.height_order = array("I", sorted_positions(heights))
+        self.weight_order = array("I", sorted_positions(weights))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, position: int) -> Pokemon:
+        """Materialize the Pokemon at a position"""
+        sprite_url: Optional[str] = None
+        prefix_code = self.sprite_prefix_codes[position]
+        if prefix_code >= 0:
+            prefix = self.sprite_prefixes.words[prefix_code]
+            sprite_url = f"{prefix}/{self.sprite_names[position]}"
+        # pydantic-core validation is cheaper than model_construct() here
+        return Pokemon(
+            id=self.ids[position],
+            name=self.names[position],
+            height=self.heights[position],
+            weight=self.weights[position],
+            types=self.types.words_at(position),
+            abilities=self.abilities.words_at(position),
+            sprite_url=sprite_url,
+        )
+
+    def __iter__(self) -> Iterator[Pokemon]:
+        for position in range(len(self)):
+            yield self[position]
+
+
+def sorted_positions(values: IntColumn) -> List[int]:
+    return sorted(range(len(values)), key=values.__getitem__)
+
+
+def _columns(catalog: PokemonCatalog) -> Dict[str, Tuple[str, bytes]]:
+    """Every fixed-width column of a catalog as (format, raw bytes)"""
+    columns = {
+        "ids": catalog.ids,
+        "heights": catalog.heights,
+        "weights": catalog.weights,
+        "height_order": catalog.height_order,
+        "weight_order": catalog.weight_order,
+        "type_codes": catalog.types.codes,
+        "type_starts": catalog.types.starts,
+        "ability_codes": catalog.abilities.codes,
+        "ability_starts": catalog.abilities.starts,
+        "sprite_prefix_codes": catalog.sprite_prefix_codes,
+        "name_starts": catalog.names.starts,
+        "sprite_name_starts": catalog.sprite_names.starts,
+    }
+    raw = {
+        name: (memoryview(column).format, bytes(column))
+        for name, column in columns.items()
+    }
+    raw["names"] = ("B", bytes(catalog.names.data))
+    raw["sprite_names"] = ("B", bytes(catalog.sprite_names.data))
+    return raw
+
+
+def save_catalog(catalog: PokemonCatalog, path: str) -> None:
+    """Write a catalog file, atomically replacing any previous one
+
+    The file is a magic number, a JSON header with the vocabularies and the
+    offset of each column, then the columns themselves, 8-byte aligned. The
+    columns use this machine's byte order; processes that mapped the old
+    file keep reading it until they load the new one.
+    """
+    columns = _columns(catalog)
+    # Column offsets are relative to the first column, after the header
+    offset = 0
+    layout: Dict[str, Tuple[str, int, int]] = {}
+    for name, (typecode, data) in columns.items():
+        layout[name] = (typecode, offset, len(data))
+        offset += len(data) + -len(data) % 8
+    header: Dict[str, Any] = {
+        "byteorder": sys.byteorder,
+        "count": len(catalog),
+        "types": catalog.types.vocabulary.words,
+        "abilities": catalog.abilities.vocabulary.words,
+        "sprite_prefixes": catalog.sprite_prefixes.words,
+        "columns": layout,
+    }
+    encoded = json.dumps(header).encode()
+    base = len(CATALOG_MAGIC) + 8 + len(encoded)
+    base += -base % 8
+
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(CATALOG_MAGIC)
+            file.write(base.to_bytes(4, "little"))
+            file.write(len(encoded).to_bytes(4, "little"))
+            file.write(encoded)
+            for name, (_, data) in columns.items():
+                file.seek(base + layout[name][1])
+                file.write(data)
+            file.truncate(base + offset)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def load_catalog(path: str) -> PokemonCatalog:
+    """Map a catalog file read-only, sharing its pages with other processes
+
+    Columns are memoryviews over the mapping, so nothing is copied; only the
+    vocabularies are read into memory.
+    """
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapping[: len(CATALOG_MAGIC)] != CATALOG_MAGIC:
+        raise ValueError(f"{path} is not a Pokemon catalog file")
+    position = len(CATALOG_MAGIC)
+    base = int.from_bytes(mapping[position : position + 4], "little")
+    size = int.from_bytes(mapping[position + 4 : position + 8], "little")
+    header = json.loads(mapping[position + 8 : position + 8 + size])
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError(f"{path} was written with a different byte order")
+
+    view = memoryview(mapping)
+    columns = {}
+    for name, (typecode, offset, length) in header["columns"].items():
+        start = base + offset
+        columns[name] = view[start : start + length].cast(typecode)
+
+    catalog = PokemonCatalog.__new__(PokemonCatalog)
+    catalog.ids = columns["ids"]
+    catalog.heights = columns["heights"]
+    catalog.weights = columns["weights"]
+    catalog.height_order = columns["height_order"]
+    catalog.weight_order = columns["weight_order"]
+    catalog.types = _CodeLists(
+        _Vocabulary(header["types"]), columns["type_codes"], columns["type_starts"]
+    )
+    catalog.abilities = _CodeLists(
+        _Vocabulary(header["abilities"]),
+        columns["ability_codes"],
+        columns["ability_starts"],
+    )
+    catalog.sprite_prefixes = _Vocabulary(header["sprite_prefixes"])
+    catalog.sprite_prefix_codes = columns["sprite_prefix_codes"]
+    catalog.names = _Strings(columns["names"], columns["name_starts"])
+    catalog.sprite_names = _Strings(
+        columns["sprite_names"], columns["sprite_name_starts"]
+    )
+    return catalog
+
+
+def catalog_signature(path: str) -> Tuple[int, int]:
+    """Identifies one version of a catalog file; replacing it changes this"""
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns
+
+
+async def build_catalog_file(pokedex: LocalPokedex, path: str) -> int:
+    """Save the local snapshot as a catalog file, returning its size"""
+    catalog = PokemonCatalog(await pokedex.all())
+    await run_in_threadpool(save_catalog, catalog, path)
+    return len(catalog)
@@ -0,0 +1,169 @@
+import logging
+import os
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import Request
+
+from app.schemas.task import Pokemon
+from app.core.config import settings
+from app.services.catalog import (
+    PokemonCatalog,
+    _CodeLists,
+    build_catalog_file,
+    catalog_signature,
+    load_catalog,
+)
+from app.services.pokedex import LocalPokedex
+
+logger = logging.getLogger(__name__)
+
+
+def iter_bits(bits: int) -> Iterable[int]:
+    """Positions of the set bits of bits, lowest first"""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+class _SortedValues:
+    """values read in the order given by positions, without copying them"""
+
+    def __init__(self, values: Sequence[int], positions: Sequence[int]):
+        self.values = values
+        self.positions = positions
+
+    def __getitem__(self, index: int) -> int:
+        return self.values[self.positions[index]]
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+
+class _RangeIndex:
+    """Positions sorted by value, answering inclusive range queries"""
+
+    def __init__(self, values: Sequence[int], positions: Sequence[int]):
+        self.values = _SortedValues(values, positions)
+        self.positions = positions
+
+    def bits(self, low: Optional[int], high: Optional[int]) -> int:
+        start = 0 if low is None else bisect_left(self.values, low)
+        stop = len(self.values) if high is None else bisect_right(self.values, high)
+        bits = 0
+        for position in self.positions[start:stop]:
+            bits |= 1 << position
+        return bits
+
+
+def _bitsets(column: _CodeLists, size: int) -> Dict[str, int]:
+    """Bitset of the positions having each word of a catalog code column"""
+    bits = [0] * len(column.vocabulary.words)
+    for position in range(size):
+        for code in column.codes_at(position):
+            bits[code] |= 1 << position
+    return dict(zip(column.vocabulary.words, bits))
+
+
+class PokemonFilterIndex:
+    """Inverted indexes over the catalog for type/ability/size filtering
+
+    Each Pokemon gets a bit position in id order; every type and ability
+    maps to a bitset of the Pokemon having it, so combining filters is a
+    handful of integer ANDs. The catalog itself is kept in columnar form and
+    only the Pokemon on the requested page are materialized.
+    """
+
+    def __init__(self, pokemon: Iterable[Pokemon] = ()):
+        self.rebuild(pokemon)
+
+    @property
+    def catalog(self) -> PokemonCatalog:
+        return self._state[0]
+
+    def rebuild(self, pokemon: Iterable[Pokemon]) -> None:
+        """Replace the indexed catalog"""
+        self.load(PokemonCatalog(sorted(pokemon, key=lambda item: item.id)))
+
+    def load(
+        self, catalog: PokemonCatalog, source: Optional[Tuple[int, int]] = None
+    ) -> None:
+        """Index a catalog already in id order, such as a mapped catalog file
+
+        source is the signature of the file the catalog was mapped from.
+        """
+        self.source = source
+        # Swap everything in one assignment so readers never see a mix
+        self._state = (
+            catalog,
+            _bitsets(catalog.types, len(catalog)),
+            _bitsets(catalog.abilities, len(catalog)),
+            _RangeIndex(catalog.heights, catalog.height_order),
+            _RangeIndex(catalog.weights, catalog.weight_order),
+        )
+
+    def __len__(self) -> int:
+        return len(self._state[0])
+
+    def query(
+        self,
+        types: Sequence[str] = (),
+        abilities: Sequence[str] = (),
+        min_height: Optional[int] = None,
+        max_height: Optional[int] = None,
+        min_weight: Optional[int] = None,
+        max_weight: Optional[int] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Tuple[List[Pokemon], int]:
+        """Return one page of Pokemon matching every filter, plus the match count"""
+        catalog, type_bits, ability_bits, heights, weights = self._state
+        matches = (1 << len(catalog)) - 1
+        for name in types:
+            matches &= type_bits.get(name.lower(), 0)
+        for name in abilities:
+            matches &= ability_bits.get(name.lower(), 0)
+        if min_height is not None or max_height is not None:
+            matches &= heights.bits(min_height, max_height)
+        if min_weight is not None or max_weight is not None:
+            matches &= weights.bits(min_weight, max_weight)
+
+        page = []
+        for index, position in enumerate(iter_bits(matches)):
+            if index >= offset + limit:
+                break
+            if index >= offset:
+                page.append(catalog[position])
+        return page, bin(matches).count("1")
+
+
+async def refresh_filter_index(
+    index: PokemonFilterIndex, pokedex: LocalPokedex
+) -> None:
+    """Rebuild the filter index from the local snapshot, logging failures
+
+    With a catalog file configured, the index maps the file instead and only
+    reloads when it has been replaced. The file is built from the snapshot
+    if it does not exist yet.
+    """
+    path = settings.pokemon_catalog_path
+    try:
+        if path is None:
+            index.rebuild(await pokedex.all())
+            return
+        if not os.path.exists(path):
+            await build_catalog_file(pokedex, path)
+        signature = catalog_signature(path)
+        if signature != index.source:
+            index.load(load_catalog(path), source=signature)
+    except Exception:
+        logger.warning("Could not load the Pokedex for filtering", exc_info=True)
+
+
+def get_filter_index(request: Request) -> PokemonFilterIndex:
+    """Get the application-scoped Pokemon filter index"""
+    index = getattr(request.app.state, "filter_index", None)
+    if index is None:
+        index = request.app.state.filter_index = PokemonFilterIndex()
+    return index
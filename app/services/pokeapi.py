@@ -0,0 +1,205 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+import httpx
+from fastapi import Depends, HTTPException, status
+
+from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.ratelimit import AdaptiveLimiter, TokenBucket
+from app.core.resilience import CircuitBreaker, ResilientClient, UpstreamUnavailable
+from app.core.singleflight import SingleFlight
+from app.schemas.task import Pokemon
+from app.services.pokemon_cache import PokemonCache
+
+# Concurrent cache misses for the same upstream URL share one request
+upstream_flights = SingleFlight()
+
+upstream_breaker = CircuitBreaker(
+    failure_threshold=settings.pokeapi_breaker_failures,
+    reset_timeout=settings.pokeapi_breaker_reset_seconds,
+)
+
+# Every outbound PokeAPI request from this process shares these limits
+upstream_rate_limiter = TokenBucket(
+    rate=settings.pokeapi_rate_limit, burst=settings.pokeapi_rate_burst
+)
+upstream_concurrency = AdaptiveLimiter(
+    initial=settings.pokeapi_concurrency_initial,
+    min_limit=settings.pokeapi_concurrency_min,
+    max_limit=settings.pokeapi_concurrency_max,
+    latency_target=settings.pokeapi_latency_target_seconds,
+)
+
+# Refreshes of stale cache entries still running after their response
+background_refreshes: Set[asyncio.Task] = set()
+# Next-page prefetches in flight, by (limit, offset)
+background_prefetches: Dict[Tuple[int, int], asyncio.Task] = {}
+
+
+def create_upstream_client(client: httpx.AsyncClient) -> ResilientClient:
+    """PokeAPI client with deadlines, retries and the shared breaker and limits"""
+    return ResilientClient(
+        client,
+        upstream_breaker,
+        rate_limiter=upstream_rate_limiter,
+        concurrency_limiter=upstream_concurrency,
+    )
+
+
+def get_upstream_client(
+    client: httpx.AsyncClient = Depends(get_http_client),
+) -> ResilientClient:
+    return create_upstream_client(client)
+
+
+def upstream_unavailable(exc: UpstreamUnavailable) -> HTTPException:
+    headers = None
+    if exc.retry_after is not None:
+        headers = {"Retry-After": str(max(int(exc.retry_after), 1))}
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Pokemon data is temporarily unavailable",
+        headers=headers,
+    )
+
+
+async def warm_pokemon(
+    client: ResilientClient, cache: PokemonCache, pokemon_urls: Iterable[str]
+) -> None:
+    """Load Pokemon details into the cache, skipping failed lookups"""
+    semaphore = asyncio.Semaphore(settings.pokeapi_list_concurrency)
+
+    async def fetch_detail(pokemon_url: str) -> None:
+        async with semaphore:
+            await get_pokemon_detail(client, cache, pokemon_url)
+
+    await asyncio.gather(*map(fetch_detail, pokemon_urls))
+
+
+async def prefetch_page(
+    client: ResilientClient, cache: PokemonCache, limit: int, offset: int
+) -> None:
+    """Warm the detail cache for a list page nobody has asked for yet
+
+    Best effort: skipped while calls are already queuing for PokeAPI, and
+    upstream failures are ignored.
+    """
+    if upstream_concurrency.stats()["queue_depth"]:
+        return
+    try:
+        response = await client.get(
+            f"{settings.pokeapi_base_url}/pokemon",
+            params={"limit": limit, "offset": offset},
+        )
+    except UpstreamUnavailable:
+        return
+    if response.status_code != 200:
+        return
+    await warm_pokemon(
+        client,
+        cache,
+        [pokemon_data["url"] for pokemon_data in response.json()["results"]],
+    )
+
+
+def prefetch_in_background(
+    client: ResilientClient, cache: PokemonCache, limit: int, offset: int
+) -> None:
+    """Start prefetch_page() without holding up the current response"""
+    key = (limit, offset)
+    if key in background_prefetches:
+        return
+    task = asyncio.ensure_future(prefetch_page(client, cache, limit, offset))
+    background_prefetches[key] = task
+    task.add_done_callback(lambda done: background_prefetches.pop(key, None))
+
+
+async def warm_popular_pokemon(client: ResilientClient, cache: PokemonCache) -> None:
+    """Preload the most-requested Pokemon, refreshing any that have expired"""
+    pokemon_ids = await cache.most_requested(settings.pokemon_warmup_count)
+    await warm_pokemon(
+        client,
+        cache,
+        [
+            f"{settings.pokeapi_base_url}/pokemon/{pokemon_id}"
+            for pokemon_id in pokemon_ids
+        ],
+    )
+
+
+async def get_pokemon_detail(
+    client: ResilientClient, cache: PokemonCache, pokemon_url: str
+) -> Optional[Pokemon]:
+    """Helper function to get detailed Pokemon information"""
+    try:
+        return await fetch_pokemon(client, cache, pokemon_url)
+    except HTTPException:
+        return None
+
+
+async def fetch_pokemon(
+    client: ResilientClient, cache: PokemonCache, pokemon_url: str
+) -> Optional[Pokemon]:
+    """Fetch a Pokemon through the cache, returning None if upstream has no match"""
+    pokemon_url = normalize_url(pokemon_url)
+    ident = pokemon_url.rsplit("/", 1)[-1]
+    pokemon, fresh = await cache.lookup(ident)
+    if fresh:
+        return pokemon
+
+    async def fetch() -> Optional[Pokemon]:
+        try:
+            response = await client.get(pokemon_url)
+        except UpstreamUnavailable as exc:
+            raise upstream_unavailable(exc)
+
+        if response.status_code == 404:
+            return None
+        elif response.status_code != 200:
+            raise HTTPException(status_code=500, detail="Failed to fetch Pokemon data")
+
+        pokemon = parse_pokemon(response.json())
+        await cache.set(pokemon)
+        return pokemon
+
+    if pokemon is not None:
+        # Serve the stale copy now and refresh it behind the response
+        refresh_in_background(pokemon_url, fetch)
+        return pokemon
+
+    return await upstream_flights.do(pokemon_url, fetch)
+
+
+def refresh_in_background(
+    pokemon_url: str, fetch: Callable[[], Awaitable[Optional[Pokemon]]]
+) -> None:
+    async def refresh() -> None:
+        try:
+            await upstream_flights.do(pokemon_url, fetch)
+        except HTTPException:
+            # The stale copy is kept until a later refresh succeeds
+            pass
+
+    task = asyncio.ensure_future(refresh())
+    background_refreshes.add(task)
+    task.add_done_callback(background_refreshes.discard)
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of an upstream URL, used as the coalescing key"""
+    parsed = httpx.URL(url)
+    return str(parsed.copy_with(path=parsed.path.rstrip("/").lower()))
+
+
+def parse_pokemon(pokemon_data: dict) -> Pokemon:
+    """Build a Pokemon schema from a PokeAPI pokemon payload"""
+    return Pokemon(
+        id=pokemon_data["id"],
+        name=pokemon_data["name"],
+        height=pokemon_data["height"],
+        weight=pokemon_data["weight"],
+        types=[t["type"]["name"] for t in pokemon_data["types"]],
+        abilities=[a["ability"]["name"] for a in pokemon_data["abilities"]],
+        sprite_url=pokemon_data["sprites"]["front_default"],
+    )
@@ -0,0 +1,111 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.database import SessionLocal
+from app.models.pokemon import Pokemon as PokemonModel
+from app.schemas.task import Pokemon
+
+
+class LocalPokedex:
+    """Pokemon catalog served from the imported snapshot in the pokemon table"""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+
+    async def list_page(self, limit: int, offset: int) -> Tuple[List[Pokemon], int]:
+        """Return one page of Pokemon ordered by id, plus the catalog size"""
+        return await run_in_threadpool(self._list_page, limit, offset)
+
+    async def get(self, pokemon_id: int) -> Optional[Pokemon]:
+        """Look up a Pokemon by id"""
+        return await run_in_threadpool(self._get, PokemonModel.id == pokemon_id)
+
+    async def get_by_name(self, name: str) -> Optional[Pokemon]:
+        """Look up a Pokemon by its (case-insensitive) name"""
+        return await run_in_threadpool(
+            self._get, PokemonModel.name == name.strip().lower()
+        )
+
+    async def count(self) -> int:
+        """Number of Pokemon in the snapshot"""
+        return await run_in_threadpool(self._count)
+
+    async def all(self) -> List[Pokemon]:
+        """Every Pokemon in the snapshot, ordered by id"""
+        return await run_in_threadpool(self._all)
+
+    async def names(self) -> Dict[str, int]:
+        """Map every Pokemon name in the snapshot to its id"""
+        return await run_in_threadpool(self._names)
+
+    def _list_page(self, limit: int, offset: int) -> Tuple[List[Pokemon], int]:
+        db = self.session_factory()
+        try:
+            # The window count rides along with the page, so a page costs a
+            # single primary key range scan.
+            rows = (
+                db.query(PokemonModel, func.count().over())
+                .order_by(PokemonModel.id)
+                .limit(limit)
+                .offset(offset)
+                .all()
+            )
+            if rows:
+                total = rows[0][1]
+            else:
+                total = db.query(func.count(PokemonModel.id)).scalar()
+            return [Pokemon.model_validate(row) for row, _ in rows], total
+        finally:
+            db.close()
+
+    def _get(self, criterion: Any) -> Optional[Pokemon]:
+        db = self.session_factory()
+        try:
+            row = db.query(PokemonModel).filter(criterion).first()
+            return Pokemon.model_validate(row) if row else None
+        finally:
+            db.close()
+
+    def _count(self) -> int:
+        db = self.session_factory()
+        try:
+            return int(db.query(func.count(PokemonModel.id)).scalar())
+        finally:
+            db.close()
+
+    def _all(self) -> List[Pokemon]:
+        db = self.session_factory()
+        try:
+            rows = db.query(PokemonModel).order_by(PokemonModel.id).all()
+            return [Pokemon.model_validate(row) for row in rows]
+        finally:
+            db.close()
+
+    def _names(self) -> Dict[str, int]:
+        db = self.session_factory()
+        try:
+            return dict(db.query(PokemonModel.name, PokemonModel.id).all())
+        finally:
+            db.close()
+
+
+def save_pokemon(db: Session, pokemon: Iterable[Pokemon]) -> int:
+    """Upsert Pokemon into the snapshot table, returning how many were written"""
+    written = 0
+    for item in pokemon:
+        db.merge(PokemonModel(**item.model_dump()))
+        written += 1
+    db.commit()
+    return written
+
+
+def get_local_pokedex(request: Request) -> LocalPokedex:
+    """Get the application-scoped local Pokedex"""
+    pokedex = getattr(request.app.state, "local_pokedex", None)
+    if pokedex is None:
+        pokedex = request.app.state.local_pokedex = LocalPokedex()
+    return pokedex
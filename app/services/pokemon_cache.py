@@ -0,0 +1,198 @@
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi import Request
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.pokemon import PokemonCacheEntry
+from app.schemas.task import Pokemon
+
+
+class PokemonCache:
+    """Two-tier Pokemon detail cache: in-process LRU backed by a database table
+
+    Entries are fresh for ``ttl`` seconds and then stale for another
+    ``stale`` seconds, during which lookup() still returns them so callers
+    can serve them while refreshing.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = SessionLocal,
+        maxsize: int = settings.pokemon_cache_max_entries,
+        ttl: float = settings.pokemon_cache_ttl_seconds,
+        stale: float = settings.pokemon_cache_stale_seconds,
+    ):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl + stale)
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.stale = stale
+        self.persistent_hits = 0
+        self.persistent_misses = 0
+        self.stale_hits = 0
+        # Request counts not yet added to the persistent tier
+        self.pending_hits: Counter[int] = Counter()
+
+    @staticmethod
+    def key(ident: Union[int, str]) -> str:
+        """Normalize a Pokemon id or name into a cache key"""
+        return str(ident).strip().lower()
+
+    async def get(self, ident: Union[int, str]) -> Optional[Pokemon]:
+        """Look up a fresh Pokemon by id or name"""
+        pokemon, fresh = await self.lookup(ident)
+        return pokemon if fresh else None
+
+    async def lookup(self, ident: Union[int, str]) -> Tuple[Optional[Pokemon], bool]:
+        """Look up a Pokemon by id or name, and whether it is still fresh
+
+        Persistent hits are promoted to memory.
+        """
+        key = self.key(ident)
+        entry = self.memory.get(key)
+        if entry is None and self.session_factory is not None:
+            entry = await run_in_threadpool(self._load, self.session_factory, key)
+            if entry is None:
+                self.persistent_misses += 1
+            else:
+                self.persistent_hits += 1
+                self._remember(*entry)
+        if entry is None:
+            return None, False
+
+        pokemon, fresh_until = entry
+        fresh = fresh_until > time.time()
+        if not fresh:
+            self.stale_hits += 1
+        return pokemon, fresh
+
+    async def set(self, pokemon: Pokemon) -> None:
+        """Store a Pokemon in both tiers"""
+        self._remember(pokemon)
+        if self.session_factory is not None:
+            await run_in_threadpool(self._store, self.session_factory, pokemon)
+
+    def record_hit(self, pokemon_id: int) -> None:
+        """Count a request for a Pokemon, persisted by flush_hits()"""
+        self.pending_hits[pokemon_id] += 1
+
+    async def flush_hits(self) -> None:
+        """Add the request counts gathered since the last flush to the table"""
+        if self.session_factory is None or not self.pending_hits:
+            return
+        hits, self.pending_hits = self.pending_hits, Counter()
+        await run_in_threadpool(self._add_hits, self.session_factory, hits)
+
+    async def most_requested(self, limit: int) -> List[int]:
+        """Ids of the most-requested Pokemon in the persistent tier"""
+        if self.session_factory is None or limit <= 0:
+            return []
+        return await run_in_threadpool(
+            self._most_requested, self.session_factory, limit
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        return {
+            **self.memory.stats(),
+            "persistent_hits": self.persistent_hits,
+            "persistent_misses": self.persistent_misses,
+            "stale_hits": self.stale_hits,
+        }
+
+    def _remember(self, pokemon: Pokemon, fresh_until: Optional[float] = None) -> None:
+        if fresh_until is None:
+            fresh_until = time.time() + self.ttl
+        # Memory entries outlive their freshness by the stale window
+        ttl = fresh_until - time.time() + self.stale
+        entry = (pokemon, fresh_until)
+        self.memory.set(self.key(pokemon.id), entry, ttl=ttl)
+        self.memory.set(self.key(pokemon.name), entry, ttl=ttl)
+
+    def _load(
+        self, session_factory: Callable[[], Session], key: str
+    ) -> Optional[Tuple[Pokemon, float]]:
+        db = session_factory()
+        try:
+            query = db.query(PokemonCacheEntry)
+            if key.isdigit():
+                query = query.filter(PokemonCacheEntry.pokemon_id == int(key))
+            else:
+                query = query.filter(PokemonCacheEntry.name == key)
+            entry = query.first()
+            if entry is None:
+                return None
+            age = (datetime.utcnow() - entry.fetched_at).total_seconds()
+            if age >= self.ttl + self.stale:
+                return None
+            return Pokemon(**entry.data), time.time() + self.ttl - age
+        finally:
+            db.close()
+
+    def _store(self, session_factory: Callable[[], Session], pokemon: Pokemon) -> None:
+        db = session_factory()
+        try:
+            db.merge(
+                PokemonCacheEntry(
+                    pokemon_id=pokemon.id,
+                    name=self.key(pokemon.name),
+                    data=pokemon.model_dump(),
+                    fetched_at=datetime.utcnow(),
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _add_hits(
+        self, session_factory: Callable[[], Session], hits: Counter[int]
+    ) -> None:
+        db = session_factory()
+        try:
+            for pokemon_id, count in hits.items():
+                db.execute(
+                    update(PokemonCacheEntry)
+                    .where(PokemonCacheEntry.pokemon_id == pokemon_id)
+                    .values(hits=PokemonCacheEntry.hits + count)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    def _most_requested(
+        self, session_factory: Callable[[], Session], limit: int
+    ) -> List[int]:
+        db = session_factory()
+        try:
+            rows: Iterable[Tuple[int]] = (
+                db.query(PokemonCacheEntry.pokemon_id)
+                # The declarative models are untyped; mypy sees a bool here
+                .filter(PokemonCacheEntry.hits > 0)  # type: ignore[arg-type]
+                .order_by(PokemonCacheEntry.hits.desc())
+                .limit(limit)
+            )
+            return [pokemon_id for (pokemon_id,) in rows]
+        finally:
+            db.close()
+
+
+def create_pokemon_cache() -> PokemonCache:
+    """Create the application-scoped Pokemon cache from settings"""
+    return PokemonCache(
+        session_factory=SessionLocal if settings.pokemon_cache_persistent else None
+    )
+
+
+def get_pokemon_cache(request: Request) -> PokemonCache:
+    """Get the application-scoped Pokemon cache"""
+    cache = getattr(request.app.state, "pokemon_cache", None)
+    if cache is None:
+        cache = request.app.state.pokemon_cache = create_pokemon_cache()
+    return cache
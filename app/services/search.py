@@ -0,0 +1,194 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.resilience import ResilientClient
+from app.services.pokedex import LocalPokedex
+
+logger = logging.getLogger(__name__)
+
+_END = ""
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of text, padded so short names still produce some"""
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between a and b"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+class NameIndex:
+    """In-memory name index: a trie for prefixes and trigrams for fuzzy matches"""
+
+    def __init__(self, names: Optional[Dict[str, int]] = None):
+        self._trie: dict = {}
+        self._ids: Dict[str, int] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self.refresh(names or {})
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def add(self, name: str, pokemon_id: int) -> None:
+        """Index name, replacing the id if it is already present"""
+        name = name.lower()
+        if name not in self._ids:
+            node = self._trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node[_END] = name
+            for gram in trigrams(name):
+                self._grams.setdefault(gram, set()).add(name)
+        self._ids[name] = pokemon_id
+
+    def remove(self, name: str) -> None:
+        """Drop name from the index"""
+        name = name.lower()
+        if self._ids.pop(name, None) is None:
+            return
+
+        path = [self._trie]
+        for char in name:
+            path.append(path[-1][char])
+        del path[-1][_END]
+        # Prune the branches that no longer lead to any name
+        for char, node in zip(reversed(name), reversed(path[:-1])):
+            if node[char]:
+                break
+            del node[char]
+
+        for gram in trigrams(name):
+            names = self._grams[gram]
+            names.discard(name)
+            if not names:
+                del self._grams[gram]
+
+    def refresh(self, names: Dict[str, int]) -> Tuple[int, int]:
+        """Apply the difference with a fresh catalog, returning (added, removed)"""
+        names = {name.lower(): pokemon_id for name, pokemon_id in names.items()}
+        stale = [name for name in self._ids if name not in names]
+        for name in stale:
+            self.remove(name)
+        added = 0
+        for name, pokemon_id in names.items():
+            if self._ids.get(name) != pokemon_id:
+                added += name not in self._ids
+                self.add(name, pokemon_id)
+        return added, len(stale)
+
+    def prefix(self, prefix: str) -> Iterable[str]:
+        """Names starting with prefix, in alphabetical order"""
+        node = self._trie
+        for char in prefix.lower():
+            child = node.get(char)
+            if child is None:
+                return
+            node = child
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if _END in node:
+                yield node[_END]
+            stack.extend(
+                node[char] for char in sorted(node, reverse=True) if char != _END
+            )
+
+    def search(
+        self, query: str, fuzzy: bool = True, min_score: float = 0.5
+    ) -> List[Tuple[str, int, float]]:
+        """Rank names matching query as (name, id, score), best first"""
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        scores: Dict[str, float] = {}
+        # Prefix matches rank above substring matches, which rank above
+        # typo-tolerant matches; within a tier closer lengths rank higher.
+        for name in self.prefix(query):
+            scores[name] = 0.8 + 0.2 * len(query) / len(name)
+
+        if fuzzy:
+            query_grams = trigrams(query)
+            overlaps: Dict[str, int] = {}
+            for gram in query_grams:
+                for name in self._grams.get(gram, ()):
+                    overlaps[name] = overlaps.get(name, 0) + 1
+            for name, overlap in overlaps.items():
+                if name in scores or overlap / len(query_grams) < 0.3:
+                    continue
+                if query in name:
+                    scores[name] = 0.6 + 0.2 * len(query) / len(name)
+                    continue
+                distance = edit_distance(query, name)
+                score = 0.6 * (1 - distance / max(len(query), len(name)))
+                if score >= min_score * 0.6:
+                    scores[name] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(name, self._ids[name], round(score, 4)) for name, score in ranked]
+
+
+async def load_pokemon_names(
+    client: ResilientClient, pokedex: LocalPokedex
+) -> Dict[str, int]:
+    """Fetch every Pokemon name and id from the configured catalog source"""
+    if settings.pokemon_source == "local":
+        return await pokedex.names()
+
+    response = await client.get(
+        f"{settings.pokeapi_base_url}/pokemon", params={"limit": 100000, "offset": 0}
+    )
+    response.raise_for_status()
+    return {
+        result["name"]: int(result["url"].rstrip("/").rsplit("/", 1)[-1])
+        for result in response.json()["results"]
+    }
+
+
+async def refresh_name_index(
+    index: NameIndex, client: ResilientClient, pokedex: LocalPokedex
+) -> bool:
+    """Bring the index in line with the catalog, logging rather than raising
+
+    Returns whether the names could be loaded.
+    """
+    try:
+        names = await load_pokemon_names(client, pokedex)
+    except Exception:
+        logger.warning("Could not load Pokemon names for search", exc_info=True)
+        return False
+    added, removed = index.refresh(names)
+    if added or removed:
+        logger.info("Search index refreshed: +%d -%d names", added, removed)
+    return True
+
+
+def get_name_index(request: Request) -> NameIndex:
+    """Get the application-scoped Pokemon name index"""
+    index = getattr(request.app.state, "name_index", None)
+    if index is None:
+        index = request.app.state.name_index = NameIndex()
+    return index
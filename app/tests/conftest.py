@@ -1,25 +1,56 @@
+import tempfile
+
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-
-from app.core.database import Base, get_db
-from app.core.security import hash_password
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.database import (
+    Base,
+    get_async_db,
+    get_async_read_db,
+    get_db,
+    to_async_url,
+)
+from app.core.http import get_http_client
+from app.core.sqlite import SerializedWriteSession, apply_sqlite_pragmas
+from app.core.middleware import response_cache
+from app.core.passwords import hash_password
+from app.core.security import principal_cache
 from app.main import app
 from app.models.user import User
 from app.models.task import Favorite
+from app.services.pokeapi import upstream_breaker
+from app.services.pokemon_cache import PokemonCache, get_pokemon_cache
 
-
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# The sync fixtures and the async request sessions must see the same data,
+# so both engines point at one throwaway database file
+test_db_dir = tempfile.TemporaryDirectory()
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{test_db_dir.name}/test.db"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+apply_sqlite_pragmas(engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient runs each request on a fresh event loop, so connections
+# must not outlive the session that opened them
+async_engine = create_async_engine(
+    to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool
+)
+apply_sqlite_pragmas(async_engine.sync_engine)
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=SerializedWriteSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 
 def override_get_db():
     try:
@@ -29,7 +60,28 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_async_read_db] = override_get_async_db
+
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    response_cache.clear()
+    yield
+    response_cache.clear()
 
 
 @pytest.fixture(scope="function")
@@ -81,3 +133,77 @@ def auth_headers(sample_user):
 @pytest.fixture
 def client():
     return TestClient(app)
+
+
+@pytest.fixture
+def pokemon_cache(tmp_path):
+    # A file database gives each threadpool worker its own connection
+    cache_engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    Base.metadata.create_all(bind=cache_engine)
+    cache = PokemonCache(session_factory=sessionmaker(bind=cache_engine))
+    app.dependency_overrides[get_pokemon_cache] = lambda: cache
+    yield cache
+    app.dependency_overrides.pop(get_pokemon_cache, None)
+    cache_engine.dispose()
+
+
+def pokemon_payload(pokemon_id, name):
+    return {
+        "id": pokemon_id,
+        "name": name,
+        "height": 7,
+        "weight": 69,
+        "types": [{"type": {"name": "grass"}}, {"type": {"name": "poison"}}],
+        "abilities": [{"ability": {"name": "overgrow"}}],
+        "sprites": {"front_default": f"https://sprites.example/{pokemon_id}.png"},
+    }
+
+
+POKEDEX = {1: "bulbasaur", 2: "ivysaur", 3: "venusaur", 4: "charmander"}
+
+
+class FakePokeAPI:
+    def __init__(self):
+        self.requests = []
+        self.failing = set()
+
+    def handler(self, request):
+        self.requests.append(request)
+        path = request.url.path.rsplit("/api/v2", 1)[-1].rstrip("/")
+        if path == "/pokemon":
+            limit = int(request.url.params.get("limit", 20))
+            offset = int(request.url.params.get("offset", 0))
+            ids = sorted(POKEDEX)[offset : offset + limit]
+            return httpx.Response(
+                200,
+                json={
+                    "count": len(POKEDEX),
+                    "next": None,
+                    "previous": None,
+                    "results": [
+                        {
+                            "name": POKEDEX[i],
+                            "url": f"{settings.pokeapi_base_url}/pokemon/{i}/",
+                        }
+                        for i in ids
+                    ],
+                },
+            )
+        ident = path.rsplit("/", 1)[-1]
+        if ident in self.failing:
+            return httpx.Response(500, text="Internal Server Error")
+        for pokemon_id, name in POKEDEX.items():
+            if ident in (str(pokemon_id), name):
+                return httpx.Response(200, json=pokemon_payload(pokemon_id, name))
+        return httpx.Response(404, text="Not Found")
+
+
+@pytest.fixture
+def fake_pokeapi(pokemon_cache):
+    fake = FakePokeAPI()
+    upstream = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+    app.dependency_overrides[get_http_client] = lambda: upstream
+    upstream_breaker.reset()
+    yield fake
+    app.dependency_overrides.pop(get_http_client, None)
+    upstream_breaker.reset()
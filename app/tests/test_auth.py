@@ -1,7 +1,17 @@
+import asyncio
+import time
+
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from app.core import passwords
+from app.core.passwords import (
+    PasswordWorkerPool,
+    build_password_context,
+    password_pool,
+)
 from app.main import app
 from app.models.user import User
 
@@ -127,3 +137,93 @@ class TestTokenValidation:
 
         response = client.post("/api/v1/auth/token", data=login_data)
         assert response.status_code == 200
+
+
+class TestPasswordWorkerPool:
+    def test_saturated_pool_rejects_new_work(self):
+        pool = PasswordWorkerPool(max_workers=1, max_pending=1)
+
+        async def main():
+            slow = asyncio.ensure_future(pool.run(time.sleep, 0.05))
+            await asyncio.sleep(0)
+            with pytest.raises(HTTPException) as exc_info:
+                await pool.run(time.sleep, 0)
+            await slow
+            return exc_info.value
+
+        error = asyncio.run(main())
+        assert error.status_code == 429
+        assert pool.stats()["rejected"] == 1
+        assert pool.stats()["pending"] == 0
+
+    def test_login_returns_429_when_saturated(
+        self, db_session, sample_user, monkeypatch
+    ):
+        monkeypatch.setattr(password_pool, "max_pending", 0)
+
+        login_data = {"email": sample_user.email, "password": "testpass123"}
+        response = client.post("/api/v1/auth/login", json=login_data)
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+
+
+class TestPasswordPolicy:
+    def make_user(self, db_session, hashed_password):
+        user = User(
+            username="legacy",
+            email="legacy@example.com",
+            hashed_password=hashed_password,
+            is_active=True,
+        )
+        db_session.add(user)
+        db_session.commit()
+        return user
+
+    def login(self):
+        login_data = {"email": "legacy@example.com", "password": "testpass123"}
+        return client.post("/api/v1/auth/login", json=login_data)
+
+    def test_login_upgrades_weaker_bcrypt_hash(self, db_session, monkeypatch):
+        weak = build_password_context(bcrypt_rounds=4).hash("testpass123")
+        user = self.make_user(db_session, weak)
+        monkeypatch.setattr(
+            passwords, "pwd_context", build_password_context(bcrypt_rounds=5)
+        )
+
+        assert self.login().status_code == 200
+
+        db_session.refresh(user)
+        assert user.hashed_password.startswith("$2b$05$")
+        assert self.login().status_code == 200
+
+    def test_login_migrates_to_preferred_scheme(self, db_session, monkeypatch):
+        pytest.importorskip("argon2")
+        legacy = build_password_context(bcrypt_rounds=4).hash("testpass123")
+        user = self.make_user(db_session, legacy)
+        monkeypatch.setattr(
+            passwords,
+            "pwd_context",
+            build_password_context(
+                schemes=["argon2", "bcrypt"],
+                bcrypt_rounds=4,
+                argon2_memory_cost=1024,
+                argon2_time_cost=1,
+                argon2_parallelism=1,
+            ),
+        )
+
+        assert self.login().status_code == 200
+
+        db_session.refresh(user)
+        assert user.hashed_password.startswith("$argon2")
+
+    def test_current_hash_is_left_alone(self, db_session, monkeypatch):
+        context = build_password_context(bcrypt_rounds=4)
+        monkeypatch.setattr(passwords, "pwd_context", context)
+        user = self.make_user(db_session, context.hash("testpass123"))
+        original = user.hashed_password
+
+        assert self.login().status_code == 200
+
+        db_session.refresh(user)
+        assert user.hashed_password == original
@@ -0,0 +1,104 @@
+import asyncio
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.database import Base, engine_options, to_async_url
+from app.core.sqlite import SerializedWriteSession, SQLiteWriter, apply_sqlite_pragmas
+from app.models.task import Favorite
+from app.models.user import User
+
+
+class TestEngineOptions:
+    def test_postgres_pool_and_statement_timeout(self, monkeypatch):
+        monkeypatch.setattr(settings, "database_pool_size", 20)
+        monkeypatch.setattr(settings, "database_statement_timeout_ms", 5000)
+
+        options = engine_options("postgresql://app:secret@db/pokemon")
+        assert options["pool_size"] == 20
+        assert options["pool_pre_ping"] is True
+        assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+        async_url = to_async_url("postgresql://app:secret@db/pokemon")
+        assert async_url == "postgresql+asyncpg://app:secret@db/pokemon"
+        assert engine_options(async_url)["connect_args"] == {
+            "server_settings": {"statement_timeout": "5000"}
+        }
+
+    def test_statement_timeout_can_be_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "database_statement_timeout_ms", 0)
+
+        assert "connect_args" not in engine_options("postgresql://db/pokemon")
+
+    def test_sqlite_memory_has_no_pool_sizing(self):
+        options = engine_options("sqlite:///:memory:")
+        assert "pool_size" not in options
+        assert options["connect_args"] == {"check_same_thread": False}
+
+        options = engine_options("sqlite:///./pokemon_api.db")
+        assert options["pool_size"] == settings.database_pool_size
+
+
+class TestSQLiteProfile:
+    def test_pragmas_are_applied_on_connect(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+        apply_sqlite_pragmas(engine)
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            # NORMAL
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == (
+                settings.sqlite_busy_timeout_ms
+            )
+        engine.dispose()
+
+    def test_concurrent_writers_are_queued(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'writes.db'}"
+        sync_engine = create_engine(url)
+        Base.metadata.create_all(bind=sync_engine)
+        with sync_engine.begin() as conn:
+            conn.execute(
+                insert(User),
+                [
+                    {
+                        "id": 1,
+                        "username": "ash",
+                        "email": "ash@example.com",
+                        "hashed_password": "x",
+                        "is_active": True,
+                    }
+                ],
+            )
+
+        class Session(SerializedWriteSession):
+            writer = SQLiteWriter()
+
+        async def run():
+            engine = create_async_engine(to_async_url(url), poolclass=NullPool)
+            apply_sqlite_pragmas(engine.sync_engine)
+            session_factory = async_sessionmaker(engine, class_=Session)
+
+            async def write(pokemon_id):
+                async with session_factory() as db:
+                    db.add(
+                        Favorite(
+                            user_id=1,
+                            pokemon_id=pokemon_id,
+                            pokemon_name=f"pokemon{pokemon_id}",
+                        )
+                    )
+                    await db.commit()
+
+            await asyncio.gather(*(write(i) for i in range(1, 21)))
+            await engine.dispose()
+
+        asyncio.run(run())
+
+        with sync_engine.connect() as conn:
+            count = conn.execute(text("SELECT count(*) FROM favorites")).scalar()
+        assert count == 20
+        assert Session.writer.stats()["acquired"] == 20
+        assert Session.writer.stats()["busy"] is False
+        sync_engine.dispose()
@@ -0,0 +1,234 @@
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.database import get_async_read_db
+from app.main import app
+from app.models.task import Favorite
+from app.tests.conftest import (
+    TestingAsyncSessionLocal,
+    TestingSessionLocal,
+    async_engine,
+    override_get_async_db,
+)
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def many_favorites(db_session, sample_user):
+    # Rows created in one statement share a created_at second, so ordering
+    # within the page relies on the id tie-breaker.
+    favorites = [
+        Favorite(user_id=sample_user.id, pokemon_id=i, pokemon_name=f"pokemon{i}")
+        for i in range(1, 8)
+    ]
+    favorites.append(
+        Favorite(
+            user_id=sample_user.id,
+            pokemon_id=99,
+            pokemon_name="inactive",
+            is_active=False,
+        )
+    )
+    db_session.add_all(favorites)
+    db_session.commit()
+    return favorites
+
+
+@contextmanager
+def added_concurrently(favorite):
+    """Insert favorite from another connection right after the request's
+    first lookup of favorites, as a concurrent request would"""
+    added = []
+
+    def add(conn, cursor, statement, parameters, context, executemany):
+        if not added and statement.startswith("SELECT favorites.id"):
+            added.append(statement)
+            with TestingSessionLocal() as db:
+                db.add(favorite)
+                db.commit()
+
+    sync_engine = async_engine.sync_engine
+    event.listen(sync_engine, "after_cursor_execute", add)
+    try:
+        yield added
+    finally:
+        event.remove(sync_engine, "after_cursor_execute", add)
+
+
+class TestFavoritesPagination:
+    def test_pages_cover_every_active_favorite_once(self, auth_headers, many_favorites):
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 3}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/favorites/", params=params, headers=auth_headers)
+            assert response.status_code == 200
+
+            data = response.json()
+            assert len(data["favorites"]) <= 3
+            seen.extend(f["pokemon_id"] for f in data["favorites"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+    def test_total_is_computed_on_request(self, auth_headers, many_favorites):
+        response = client.get("/favorites/?limit=2", headers=auth_headers)
+        assert response.json()["total"] is None
+
+        response = client.get(
+            "/favorites/?limit=2&include_total=true", headers=auth_headers
+        )
+        assert response.json()["total"] == 7
+
+    def test_invalid_cursor(self, auth_headers):
+        response = client.get("/favorites/?cursor=not-a-cursor", headers=auth_headers)
+        assert response.status_code == 400
+
+
+class TestFavoriteAdd:
+    def test_concurrent_add_of_the_same_pokemon(self, auth_headers, sample_user):
+        favorite = Favorite(user_id=sample_user.id, pokemon_id=5, pokemon_name="e")
+        with added_concurrently(favorite) as added:
+            response = client.post("/favorites/5?pokemon_name=e", headers=auth_headers)
+
+        assert added
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Pokemon is already in favorites"
+
+    def test_concurrently_removed_favorite_is_reactivated(
+        self, auth_headers, sample_user
+    ):
+        favorite = Favorite(
+            user_id=sample_user.id, pokemon_id=5, pokemon_name="e", is_active=False
+        )
+        with added_concurrently(favorite) as added:
+            response = client.post("/favorites/5?pokemon_name=e", headers=auth_headers)
+
+        assert added
+        assert response.status_code == 201
+        assert response.json()["is_active"] is True
+
+
+class TestFavoritesBatch:
+    def test_batch_add_reports_each_item(self, auth_headers, db_session, sample_user):
+        db_session.add_all(
+            [
+                Favorite(user_id=sample_user.id, pokemon_id=1, pokemon_name="a"),
+                Favorite(
+                    user_id=sample_user.id,
+                    pokemon_id=2,
+                    pokemon_name="b",
+                    is_active=False,
+                ),
+            ]
+        )
+        db_session.commit()
+
+        response = client.post(
+            "/favorites/batch",
+            json={
+                "favorites": [
+                    {"pokemon_id": 1, "pokemon_name": "a"},
+                    {"pokemon_id": 2, "pokemon_name": "b"},
+                    {"pokemon_id": 3, "pokemon_name": "c"},
+                    {"pokemon_id": 3, "pokemon_name": "c"},
+                ]
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        assert response.json()["results"] == [
+            {"pokemon_id": 1, "status": "already_favorite"},
+            {"pokemon_id": 2, "status": "reactivated"},
+            {"pokemon_id": 3, "status": "added"},
+        ]
+
+        response = client.get("/favorites/?include_total=true", headers=auth_headers)
+        assert response.json()["total"] == 3
+
+    def test_batch_add_reactivates_rows_inserted_concurrently(
+        self, auth_headers, sample_user
+    ):
+        favorite = Favorite(
+            user_id=sample_user.id, pokemon_id=3, pokemon_name="c", is_active=False
+        )
+        with added_concurrently(favorite) as added:
+            response = client.post(
+                "/favorites/batch",
+                json={"favorites": [{"pokemon_id": 3, "pokemon_name": "c"}]},
+                headers=auth_headers,
+            )
+
+        assert added
+        assert response.status_code == 200
+        response = client.get("/favorites/check/3", headers=auth_headers)
+        assert response.json()["is_favorite"] is True
+
+    def test_batch_remove_and_check(self, auth_headers, many_favorites):
+        response = client.post(
+            "/favorites/batch/remove",
+            json={"pokemon_ids": [1, 2, 99, 500]},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        assert [r["status"] for r in response.json()["results"]] == [
+            "removed",
+            "removed",
+            "not_found",
+            "not_found",
+        ]
+
+        response = client.post(
+            "/favorites/batch/check",
+            json={"pokemon_ids": [1, 3, 99]},
+            headers=auth_headers,
+        )
+        assert response.json()["results"] == {"1": False, "3": True, "99": False}
+
+    def test_batch_size_is_limited(self, auth_headers):
+        response = client.post(
+            "/favorites/batch/check",
+            json={"pokemon_ids": list(range(501))},
+            headers=auth_headers,
+        )
+        assert response.status_code == 422
+
+
+@pytest.fixture
+def read_sessions():
+    opened = []
+
+    async def override_get_async_read_db():
+        async with TestingAsyncSessionLocal() as db:
+            opened.append(db)
+            yield db
+
+    app.dependency_overrides[get_async_read_db] = override_get_async_read_db
+    yield opened
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
+
+
+class TestReadReplicaRouting:
+    def test_reads_use_the_read_session(self, auth_headers, sample_task, read_sessions):
+        assert client.get("/favorites/", headers=auth_headers).status_code == 200
+        assert client.get("/favorites/check/1", headers=auth_headers).status_code == 200
+        response = client.post(
+            "/favorites/batch/check", json={"pokemon_ids": [1]}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert len(read_sessions) == 3
+
+    def test_writes_use_the_primary(self, auth_headers, read_sessions):
+        response = client.post(
+            "/favorites/25", params={"pokemon_name": "pikachu"}, headers=auth_headers
+        )
+        assert response.status_code == 201
+        assert read_sessions == []
@@ -1,11 +1,19 @@
+import asyncio
+import zlib
+from datetime import datetime
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.middleware import StreamCompressor, choose_encoding
+from app.core.responses import PydanticJSONResponse
+from app import main
 from app.main import app
 from app.models.user import User
 from app.models.task import Favorite
-
+from app.schemas.task import Pokemon
 
 client = TestClient(app)
 
@@ -103,3 +111,80 @@ class TestAppStartup:
     def test_app_can_start_without_import_errors(self):
         response = client.get("/health")
         assert response.status_code == 200
+
+    def test_first_index_load_is_retried_until_it_succeeds(self, monkeypatch):
+        outcomes = [False, False, True]
+        calls = []
+
+        async def refresh(app):
+            calls.append(app)
+            return outcomes.pop(0)
+
+        monkeypatch.setattr(main, "refresh_catalog_indexes", refresh)
+        monkeypatch.setattr(settings, "pokemon_search_retry_backoff", 0.001)
+
+        async def run():
+            task = asyncio.create_task(main.keep_catalog_indexes_fresh(app))
+            while outcomes:
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.01)
+            task.cancel()
+
+        asyncio.run(asyncio.wait_for(run(), 5))
+        # Once loaded, the next refresh waits for the refresh interval
+        assert len(calls) == 3
+
+
+class TestPydanticJSONResponse:
+    def test_models_and_plain_content_render_compactly(self):
+        pokemon = Pokemon(
+            id=1, name="bulbasaur", height=7, weight=69, types=["grass"], abilities=[]
+        )
+        assert PydanticJSONResponse(pokemon).body == pokemon.model_dump_json().encode()
+
+        response = PydanticJSONResponse({"at": datetime(2024, 1, 2, 3, 4, 5)})
+        assert response.body == b'{"at":"2024-01-02T03:04:05"}'
+        assert response.headers["content-type"] == "application/json"
+
+
+class TestCompression:
+    def test_large_json_is_gzipped_when_accepted(self):
+        response = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.json()["info"]["title"] == "Pokemon API"
+
+        response = client.get("/openapi.json", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+
+    def test_small_responses_are_sent_as_is(self):
+        response = client.get("/health", headers={"Accept-Encoding": "gzip, br"})
+        assert "content-encoding" not in response.headers
+
+    def test_encoding_negotiation(self):
+        assert choose_encoding("gzip, br;q=0.5") == "gzip"
+        assert choose_encoding("br;q=0, gzip") == "gzip"
+        assert choose_encoding("gzip;q=0") is None
+        assert choose_encoding("identity") is None
+
+    def test_streamed_chunks_decode_as_they_arrive(self):
+        stream = StreamCompressor("gzip")
+        decoder = zlib.decompressobj(31)
+        assert decoder.decompress(stream.compress(b'{"id":1}\n')) == b'{"id":1}\n'
+        assert decoder.decompress(stream.compress(b'{"id":2}\n')) == b'{"id":2}\n'
+        assert decoder.decompress(stream.finish()) == b""
+        assert decoder.eof
+
+    def test_streamed_brotli_chunks_decode_as_they_arrive(self):
+        brotli = pytest.importorskip("brotli")
+        stream = StreamCompressor("br")
+        decoder = brotli.Decompressor()
+        assert decoder.process(stream.compress(b'{"id":1}\n')) == b'{"id":1}\n'
+        assert decoder.process(stream.finish()) == b""
+        assert decoder.is_finished()
+
+    def test_brotli_wins_ties(self):
+        pytest.importorskip("brotli")
+        assert choose_encoding("*") == "br"
+        assert choose_encoding("gzip, br") == "br"
+        assert choose_encoding("gzip;q=0.5, br;q=0.8") == "br"
@@ -0,0 +1,606 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.middleware import response_cache
+from app.core.security import principal_cache
+from app.main import app
+from app.management.import_pokedex import load_directory
+from app.schemas.task import Pokemon
+from app.services.catalog import PokemonCatalog, load_catalog, save_catalog
+from app.services.filters import (
+    PokemonFilterIndex,
+    get_filter_index,
+    refresh_filter_index,
+)
+from app.services.pokeapi import (
+    background_prefetches,
+    create_upstream_client,
+    parse_pokemon,
+    warm_popular_pokemon,
+)
+from app.services.pokedex import LocalPokedex, get_local_pokedex, save_pokemon
+from app.services.pokemon_cache import PokemonCache, get_pokemon_cache
+from app.services.search import NameIndex, get_name_index
+from app.tests.conftest import POKEDEX, TestingSessionLocal, pokemon_payload
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def local_pokedex(db_session, monkeypatch):
+    save_pokemon(
+        db_session,
+        [parse_pokemon(pokemon_payload(i, name)) for i, name in POKEDEX.items()],
+    )
+    monkeypatch.setattr(settings, "pokemon_source", "local")
+    app.dependency_overrides[get_local_pokedex] = lambda: LocalPokedex(
+        TestingSessionLocal
+    )
+    yield
+    app.dependency_overrides.pop(get_local_pokedex, None)
+
+
+class TestPokemonList:
+    def test_list_pokemon(self, auth_headers, fake_pokeapi):
+        response = client.get("/api/v1/pokemon/?limit=3", headers=auth_headers)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["count"] == 4
+        assert [p["name"] for p in data["results"]] == [
+            "bulbasaur",
+            "ivysaur",
+            "venusaur",
+        ]
+        assert data["results"][0]["types"] == ["grass", "poison"]
+
+    def test_list_skips_failed_details_and_keeps_order(
+        self, auth_headers, fake_pokeapi
+    ):
+        fake_pokeapi.failing.add("2")
+
+        response = client.get("/api/v1/pokemon/?limit=4", headers=auth_headers)
+        assert response.status_code == 200
+        assert [p["id"] for p in response.json()["results"]] == [1, 3, 4]
+
+
+class TestPokemonListStreaming:
+    def test_stream_emits_one_pokemon_per_line(self, auth_headers, fake_pokeapi):
+        fake_pokeapi.failing.add("2")
+
+        response = client.get(
+            "/api/v1/pokemon/?limit=4&stream=true", headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.headers["x-total-count"] == "4"
+        assert "etag" not in response.headers
+
+        lines = response.text.splitlines()
+        assert sorted(json.loads(line)["id"] for line in lines) == [1, 3, 4]
+
+    def test_stream_from_snapshot_keeps_page_order(self, auth_headers, local_pokedex):
+        response = client.get(
+            "/api/v1/pokemon/?limit=2&offset=1&stream=true", headers=auth_headers
+        )
+
+        names = [json.loads(line)["name"] for line in response.text.splitlines()]
+        assert names == ["ivysaur", "venusaur"]
+        assert response.headers["x-total-count"] == "4"
+
+    def test_stream_is_gzipped_when_accepted(self, auth_headers, local_pokedex):
+        response = client.get(
+            "/api/v1/pokemon/?limit=2&offset=1&stream=true",
+            headers={**auth_headers, "Accept-Encoding": "gzip"},
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert "Accept-Encoding" in response.headers["vary"]
+
+        names = [json.loads(line)["name"] for line in response.text.splitlines()]
+        assert names == ["ivysaur", "venusaur"]
+
+
+class TestPokemonDetail:
+    def test_get_pokemon(self, auth_headers, fake_pokeapi):
+        response = client.get("/api/v1/pokemon/4", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["name"] == "charmander"
+
+    def test_get_unknown_pokemon(self, auth_headers, fake_pokeapi):
+        response = client.get("/api/v1/pokemon/999", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_search_pokemon_by_name(self, auth_headers, fake_pokeapi):
+        response = client.post("/api/v1/pokemon/search/Ivysaur", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["id"] == 2
+
+
+@pytest.fixture
+def no_response_cache(monkeypatch):
+    monkeypatch.setattr(settings, "response_cache_enabled", False)
+
+
+class TestPrefetch:
+    def test_page_is_sent_before_the_next_one_is_prefetched(
+        self, auth_headers, fake_pokeapi, pokemon_cache
+    ):
+        async def main():
+            # Details of the next page hang until the first page is back
+            released = asyncio.Event()
+
+            async def handler(request):
+                if request.url.path.rstrip("/").endswith(("/3", "/4")):
+                    await released.wait()
+                return fake_pokeapi.handler(request)
+
+            upstream = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            app.dependency_overrides[get_http_client] = lambda: upstream
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://testserver"
+            ) as asgi:
+                response = await asyncio.wait_for(
+                    asgi.get("/api/v1/pokemon/?limit=2", headers=auth_headers), 5
+                )
+                (prefetch,) = background_prefetches.values()
+                sent_before_prefetch = not prefetch.done()
+                released.set()
+                await prefetch
+            return response, sent_before_prefetch
+
+        response, sent_before_prefetch = asyncio.run(main())
+        assert [p["id"] for p in response.json()["results"]] == [1, 2]
+        assert sent_before_prefetch
+        assert pokemon_cache.memory.get("3") is not None
+        fake_pokeapi.requests.clear()
+
+        response = client.get("/api/v1/pokemon/4", headers=auth_headers)
+        assert response.json()["name"] == "charmander"
+        assert fake_pokeapi.requests == []
+
+    def test_last_page_has_nothing_to_prefetch(self, auth_headers, fake_pokeapi):
+        client.get("/api/v1/pokemon/?limit=2&offset=2", headers=auth_headers)
+        assert len(fake_pokeapi.requests) == 3
+
+    def test_favorites_are_warmed_at_login(
+        self, sample_task, fake_pokeapi, pokemon_cache, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "pokemon_prefetch_favorites_on_login", True)
+
+        response = client.post(
+            "/api/v1/auth/login",
+            json={"email": "test@example.com", "password": "testpass123"},
+        )
+        assert response.status_code == 200
+        assert pokemon_cache.memory.get("bulbasaur") is not None
+
+    def test_most_requested_are_warmed_at_startup(
+        self, auth_headers, fake_pokeapi, pokemon_cache
+    ):
+        for pokemon_id in (4, 2, 2, 2):
+            response = client.get(f"/api/v1/pokemon/{pokemon_id}", headers=auth_headers)
+        # Requests answered by the response cache count too, 304s included
+        client.get(
+            "/api/v1/pokemon/2",
+            headers={**auth_headers, "If-None-Match": response.headers["etag"]},
+        )
+        assert len(response_cache._data) == 2
+        assert pokemon_cache.pending_hits == {2: 4, 4: 1}
+        asyncio.run(pokemon_cache.flush_hits())
+        # Refreshing an entry keeps its count
+        asyncio.run(pokemon_cache.set(parse_pokemon(pokemon_payload(2, "ivysaur"))))
+
+        restarted = PokemonCache(session_factory=pokemon_cache.session_factory)
+        assert asyncio.run(restarted.most_requested(1)) == [2]
+
+        fake_pokeapi.requests.clear()
+        upstream = create_upstream_client(
+            httpx.AsyncClient(transport=httpx.MockTransport(fake_pokeapi.handler))
+        )
+        asyncio.run(warm_popular_pokemon(upstream, restarted))
+        assert restarted.memory.get("ivysaur") is not None
+        assert restarted.memory.get("charmander") is not None
+        assert fake_pokeapi.requests == []
+
+
+@pytest.mark.usefixtures("no_response_cache")
+class TestPokemonCache:
+    def test_repeated_lookups_are_served_from_cache(
+        self, auth_headers, fake_pokeapi, pokemon_cache
+    ):
+        for _ in range(3):
+            response = client.get("/api/v1/pokemon/1", headers=auth_headers)
+            assert response.status_code == 200
+
+        assert len(fake_pokeapi.requests) == 1
+        assert pokemon_cache.stats()["hits"] == 2
+
+    def test_cache_is_shared_between_id_and_name(self, auth_headers, fake_pokeapi):
+        client.get("/api/v1/pokemon/?limit=2", headers=auth_headers)
+        fake_pokeapi.requests.clear()
+
+        response = client.post("/api/v1/pokemon/search/ivysaur", headers=auth_headers)
+        assert response.status_code == 200
+        assert fake_pokeapi.requests == []
+
+    def test_persistent_tier_survives_restart(
+        self, auth_headers, fake_pokeapi, pokemon_cache
+    ):
+        client.get("/api/v1/pokemon/3", headers=auth_headers)
+
+        restarted = PokemonCache(session_factory=pokemon_cache.session_factory)
+        app.dependency_overrides[get_pokemon_cache] = lambda: restarted
+        fake_pokeapi.requests.clear()
+
+        response = client.get("/api/v1/pokemon/3", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["name"] == "venusaur"
+        assert fake_pokeapi.requests == []
+        assert restarted.stats()["persistent_hits"] == 1
+
+    def test_upstream_errors_are_not_cached(self, auth_headers, fake_pokeapi):
+        fake_pokeapi.failing.add("1")
+        assert client.get("/api/v1/pokemon/1", headers=auth_headers).status_code == 500
+
+        fake_pokeapi.failing.clear()
+        assert client.get("/api/v1/pokemon/1", headers=auth_headers).status_code == 200
+
+
+class TestResponseCache:
+    def test_repeated_gets_skip_the_handler(self, auth_headers, fake_pokeapi):
+        first = client.get("/api/v1/pokemon/?limit=2&offset=2", headers=auth_headers)
+        second = client.get("/api/v1/pokemon/?offset=2&limit=2", headers=auth_headers)
+
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert second.headers["etag"] == first.headers["etag"]
+        assert second.headers["cache-control"] == settings.response_cache_control
+        assert len(fake_pokeapi.requests) == 3
+
+    def test_if_none_match_returns_304(self, auth_headers, fake_pokeapi):
+        etag = client.get("/api/v1/pokemon/1", headers=auth_headers).headers["etag"]
+        fake_pokeapi.requests.clear()
+
+        response = client.get(
+            "/api/v1/pokemon/1", headers={**auth_headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert fake_pokeapi.requests == []
+
+        response = client.get(
+            "/api/v1/pokemon/1", headers={**auth_headers, "If-None-Match": '"stale"'}
+        )
+        assert response.status_code == 200
+
+    def test_cached_bodies_still_need_a_valid_token(self, auth_headers, fake_pokeapi):
+        client.get("/api/v1/pokemon/1", headers=auth_headers)
+
+        response = client.get(
+            "/api/v1/pokemon/1", headers={"Authorization": "Bearer not-a-token"}
+        )
+        assert response.status_code == 401
+
+    def test_cached_bodies_are_refused_to_deactivated_users(
+        self, auth_headers, db_session, sample_user, fake_pokeapi
+    ):
+        assert client.get("/api/v1/pokemon/1", headers=auth_headers).status_code == 200
+
+        sample_user.is_active = False
+        db_session.commit()
+        principal_cache.clear()
+
+        response = client.get("/api/v1/pokemon/1", headers=auth_headers)
+        assert response.status_code == 401
+        assert len(fake_pokeapi.requests) == 1
+
+    def test_cached_bodies_are_refused_to_deleted_users(
+        self, auth_headers, fake_pokeapi
+    ):
+        assert client.get("/api/v1/pokemon/1", headers=auth_headers).status_code == 200
+        response = client.delete("/api/v1/users/me", headers=auth_headers)
+        assert response.status_code == 204
+
+        response = client.get("/api/v1/pokemon/1", headers=auth_headers)
+        assert response.status_code == 401
+
+    def test_pages_missing_details_are_not_cached(self, auth_headers, fake_pokeapi):
+        fake_pokeapi.failing.add("2")
+
+        response = client.get("/api/v1/pokemon/?limit=2", headers=auth_headers)
+        assert [p["id"] for p in response.json()["results"]] == [1]
+        assert response.headers["cache-control"] == "no-store"
+        assert "etag" not in response.headers
+
+        fake_pokeapi.failing.clear()
+        response = client.get("/api/v1/pokemon/?limit=2", headers=auth_headers)
+        assert [p["id"] for p in response.json()["results"]] == [1, 2]
+        assert response.headers["cache-control"] == settings.response_cache_control
+
+    def test_errors_are_not_cached(self, auth_headers, fake_pokeapi):
+        for _ in range(2):
+            response = client.get("/api/v1/pokemon/999", headers=auth_headers)
+            assert response.status_code == 404
+            assert "etag" not in response.headers
+
+        assert len(fake_pokeapi.requests) == 2
+
+
+class TestCachedCompression:
+    def test_cached_bodies_are_compressed_once(
+        self, auth_headers, fake_pokeapi, monkeypatch
+    ):
+        pytest.importorskip("brotli")
+        monkeypatch.setattr(settings, "compression_min_size", 0)
+        headers = {**auth_headers, "Accept-Encoding": "br"}
+
+        for _ in range(2):
+            response = client.get("/api/v1/pokemon/?limit=4", headers=headers)
+            assert response.headers["content-encoding"] == "br"
+            assert response.headers["etag"].endswith('-br"')
+            assert response.json()["count"] == 4
+
+        (entry,) = response_cache._data.values()
+        assert list(entry[0].encoded) == ["br"]
+
+        response = client.get(
+            "/api/v1/pokemon/?limit=4",
+            headers={**auth_headers, "Accept-Encoding": "gzip"},
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["etag"].endswith('-gzip"')
+        assert len(fake_pokeapi.requests) == 5
+
+
+class TestLocalPokedex:
+    def test_list_is_served_from_snapshot(
+        self, auth_headers, local_pokedex, fake_pokeapi
+    ):
+        response = client.get("/api/v1/pokemon/?limit=2&offset=1", headers=auth_headers)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["count"] == 4
+        assert [p["name"] for p in data["results"]] == ["ivysaur", "venusaur"]
+        assert "offset=3" in data["next_url"]
+        assert "offset=0" in data["previous_url"]
+        assert fake_pokeapi.requests == []
+
+    def test_detail_and_search(self, auth_headers, local_pokedex, fake_pokeapi):
+        response = client.get("/api/v1/pokemon/4", headers=auth_headers)
+        assert response.json()["name"] == "charmander"
+
+        response = client.post("/api/v1/pokemon/search/VENUSAUR", headers=auth_headers)
+        assert response.json()["id"] == 3
+
+        response = client.get("/api/v1/pokemon/999", headers=auth_headers)
+        assert response.status_code == 404
+        assert fake_pokeapi.requests == []
+
+    def test_load_directory_skips_non_pokemon_payloads(self, tmp_path):
+        (tmp_path / "1").mkdir()
+        (tmp_path / "1" / "index.json").write_text(
+            json.dumps(pokemon_payload(1, "bulbasaur"))
+        )
+        (tmp_path / "index.json").write_text(json.dumps({"count": 1, "results": []}))
+
+        assert [p.name for p in load_directory(tmp_path)] == ["bulbasaur"]
+
+
+@pytest.fixture
+def name_index():
+    index = NameIndex({name: pokemon_id for pokemon_id, name in POKEDEX.items()})
+    index.add("pikachu", 25)
+    index.add("raichu", 26)
+    app.dependency_overrides[get_name_index] = lambda: index
+    yield index
+    app.dependency_overrides.pop(get_name_index, None)
+
+
+class TestNameSearch:
+    def test_prefix_search(self, auth_headers, name_index):
+        response = client.get("/api/v1/pokemon/search?q=Char", headers=auth_headers)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["count"] == 1
+        assert data["results"][0] == {"id": 4, "name": "charmander", "score": 0.88}
+
+    def test_fuzzy_search_ranks_closest_first(self, auth_headers, name_index):
+        response = client.get("/api/v1/pokemon/search?q=pikachoo", headers=auth_headers)
+
+        names = [match["name"] for match in response.json()["results"]]
+        assert names[0] == "pikachu"
+        assert "bulbasaur" not in names
+
+    def test_search_is_paginated(self, auth_headers, name_index):
+        response = client.get(
+            "/api/v1/pokemon/search?q=saur&fuzzy=false", headers=auth_headers
+        )
+        assert response.json()["count"] == 0
+
+        response = client.get(
+            "/api/v1/pokemon/search?q=saur&limit=1&offset=1", headers=auth_headers
+        )
+        data = response.json()
+        assert data["count"] == 3
+        assert len(data["results"]) == 1
+
+    def test_search_is_unavailable_until_names_are_loaded(self, auth_headers):
+        app.dependency_overrides[get_name_index] = NameIndex
+        try:
+            for _ in range(2):
+                response = client.get(
+                    "/api/v1/pokemon/search?q=pika", headers=auth_headers
+                )
+                assert response.status_code == 503
+        finally:
+            app.dependency_overrides.pop(get_name_index, None)
+        assert response_cache._data == {}
+
+    def test_refresh_applies_only_changes(self):
+        index = NameIndex({"bulbasaur": 1, "ivysaur": 2})
+
+        assert index.refresh({"bulbasaur": 1, "venusaur": 3}) == (1, 1)
+        assert "ivysaur" not in index
+        assert list(index.prefix("")) == ["bulbasaur", "venusaur"]
+        assert index.search("ivy", fuzzy=False) == []
+
+
+@pytest.fixture
+def filter_index():
+    index = PokemonFilterIndex(
+        [
+            Pokemon(
+                id=6,
+                name="charizard",
+                height=17,
+                weight=905,
+                types=["fire", "flying"],
+                abilities=["blaze"],
+            ),
+            Pokemon(
+                id=1,
+                name="bulbasaur",
+                height=7,
+                weight=69,
+                types=["grass", "poison"],
+                abilities=["overgrow"],
+            ),
+            Pokemon(
+                id=4,
+                name="charmander",
+                height=6,
+                weight=85,
+                types=["fire"],
+                abilities=["blaze"],
+            ),
+            Pokemon(
+                id=16,
+                name="pidgey",
+                height=3,
+                weight=18,
+                types=["normal", "flying"],
+                abilities=["keen-eye"],
+            ),
+        ]
+    )
+    app.dependency_overrides[get_filter_index] = lambda: index
+    yield index
+    app.dependency_overrides.pop(get_filter_index, None)
+
+
+class TestPokemonFilters:
+    def test_filter_by_type(self, auth_headers, filter_index, fake_pokeapi):
+        response = client.get("/api/v1/pokemon/?type=fire", headers=auth_headers)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["count"] == 2
+        assert [p["name"] for p in data["results"]] == ["charmander", "charizard"]
+        assert fake_pokeapi.requests == []
+
+    def test_filters_are_intersected(self, auth_headers, filter_index):
+        response = client.get(
+            "/api/v1/pokemon/?type=flying&ability=blaze", headers=auth_headers
+        )
+        assert [p["id"] for p in response.json()["results"]] == [6]
+
+        response = client.get(
+            "/api/v1/pokemon/?type=fire&type=flying&max_weight=100",
+            headers=auth_headers,
+        )
+        assert response.json()["count"] == 0
+
+    def test_range_filters_are_inclusive(self, auth_headers, filter_index):
+        response = client.get(
+            "/api/v1/pokemon/?min_height=6&max_height=7", headers=auth_headers
+        )
+        assert [p["id"] for p in response.json()["results"]] == [1, 4]
+
+    def test_filtered_pages(self, auth_headers, filter_index):
+        response = client.get(
+            "/api/v1/pokemon/?type=flying&limit=1&offset=1", headers=auth_headers
+        )
+        data = response.json()
+        assert data["count"] == 2
+        assert [p["id"] for p in data["results"]] == [16]
+        assert data["next_url"] is None
+        assert "offset=0" in data["previous_url"]
+
+    def test_filters_need_snapshot(self, auth_headers):
+        app.dependency_overrides[get_filter_index] = lambda: PokemonFilterIndex()
+        try:
+            response = client.get("/api/v1/pokemon/?type=fire", headers=auth_headers)
+        finally:
+            app.dependency_overrides.pop(get_filter_index, None)
+        assert response.status_code == 503
+
+
+class TestPokemonCatalog:
+    def test_round_trips_pokemon(self):
+        pokemon = [
+            parse_pokemon(pokemon_payload(i, name)) for i, name in POKEDEX.items()
+        ]
+        pokemon.append(
+            Pokemon(
+                id=10,
+                name="caterpie",
+                height=3,
+                weight=29,
+                types=["bug"],
+                abilities=[],
+            )
+        )
+        catalog = PokemonCatalog(pokemon)
+
+        assert len(catalog) == 5
+        assert list(catalog) == pokemon
+        assert catalog[4].model_dump_json() == pokemon[4].model_dump_json()
+        assert catalog.types.vocabulary.words == ["grass", "poison", "bug"]
+        assert catalog.sprite_prefixes.words == ["https://sprites.example"]
+
+    def test_catalog_file_is_mapped_not_copied(self, tmp_path):
+        pokemon = [
+            parse_pokemon(pokemon_payload(i, name)) for i, name in POKEDEX.items()
+        ]
+        save_catalog(PokemonCatalog(pokemon), str(tmp_path / "catalog.bin"))
+
+        mapped = load_catalog(str(tmp_path / "catalog.bin"))
+        assert list(mapped) == pokemon
+        assert isinstance(mapped.ids, memoryview)
+        assert mapped.ids.readonly
+        assert [p.name for p in PokemonCatalog(mapped)] == list(POKEDEX.values())
+
+    def test_filter_index_maps_the_file_and_follows_replacements(
+        self, tmp_path, local_pokedex, monkeypatch
+    ):
+        path = str(tmp_path / "catalog.bin")
+        monkeypatch.setattr(settings, "pokemon_catalog_path", path)
+        index = PokemonFilterIndex()
+        pokedex = LocalPokedex(TestingSessionLocal)
+
+        # The first worker to refresh builds the file from the snapshot
+        asyncio.run(refresh_filter_index(index, pokedex))
+        assert index.query(types=["grass"])[1] == 4
+        catalog = index.catalog
+        asyncio.run(refresh_filter_index(index, pokedex))
+        assert index.catalog is catalog
+
+        save_catalog(
+            PokemonCatalog([parse_pokemon(pokemon_payload(4, "charmander"))]), path
+        )
+        asyncio.run(refresh_filter_index(index, pokedex))
+        assert len(index) == 1
+        assert index.query(types=["grass"])[0][0].name == "charmander"
+        # Readers of the old mapping are unaffected by the swap
+        assert catalog[0].name == "bulbasaur"
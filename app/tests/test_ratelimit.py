@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.core.ratelimit import AdaptiveLimiter, TokenBucket
+from app.tests.test_resilience import FakeTimer
+
+
+class TestTokenBucket:
+    def test_reservations_beyond_burst_wait_their_turn(self):
+        timer = FakeTimer()
+        bucket = TokenBucket(rate=10, burst=2, timer=timer)
+
+        delays = [bucket.reserve() for _ in range(4)]
+        assert delays == [0.0, 0.0, pytest.approx(0.1), pytest.approx(0.2)]
+        assert bucket.stats()["throttled"] == 2
+
+        timer.now = 10
+        assert bucket.reserve() == 0.0
+        assert bucket.stats()["tokens"] == 1
+
+    def test_acquire_sleeps_when_empty(self):
+        bucket = TokenBucket(rate=100, burst=1)
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await asyncio.gather(*(bucket.acquire() for _ in range(3)))
+            return loop.time() - started
+
+        assert asyncio.run(main()) >= 0.015
+        assert bucket.stats()["waiting"] == 0
+
+
+class TestAdaptiveLimiter:
+    def test_calls_over_the_limit_queue_in_order(self):
+        limiter = AdaptiveLimiter(
+            initial=2, min_limit=1, max_limit=10, latency_target=1.0
+        )
+        order = []
+
+        async def call(n):
+            await limiter.acquire()
+            order.append(n)
+            await asyncio.sleep(0.01)
+            limiter.release(0.01)
+
+        async def main():
+            tasks = [asyncio.ensure_future(call(n)) for n in range(4)]
+            await asyncio.sleep(0)
+            depth = limiter.stats()["queue_depth"]
+            await asyncio.gather(*tasks)
+            return depth
+
+        assert asyncio.run(main()) == 2
+        assert order == [0, 1, 2, 3]
+        assert limiter.stats()["queued"] == 2
+        assert limiter.in_flight == 0
+
+    def test_limit_grows_additively_and_backs_off_once_per_round(self):
+        timer = FakeTimer()
+        limiter = AdaptiveLimiter(
+            initial=4, min_limit=1, max_limit=10, latency_target=1.0, timer=timer
+        )
+
+        async def main():
+            for _ in range(4):
+                await limiter.acquire()
+                limiter.release(0.1)
+            assert limiter.limit == pytest.approx(4.9, abs=0.05)
+
+            for _ in range(3):
+                await limiter.acquire()
+            timer.now = 5
+            # Three overlapping calls report congestion: one backoff
+            for _ in range(3):
+                limiter.release(2.0, congested=True)
+
+        asyncio.run(main())
+        assert limiter.limit == pytest.approx(2.45, abs=0.05)
+        assert limiter.stats()["decreases"] == 1
+
+    def test_cancelled_waiters_leave_the_queue(self):
+        limiter = AdaptiveLimiter(
+            initial=1, min_limit=1, max_limit=1, latency_target=1.0
+        )
+
+        async def main():
+            await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            limiter.release(0.1)
+
+        asyncio.run(main())
+        assert limiter.stats()["queue_depth"] == 0
+        assert limiter.in_flight == 0
@@ -0,0 +1,221 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.resilience import (
+    CircuitBreaker,
+    ResilientClient,
+    UpstreamThrottled,
+    UpstreamUnavailable,
+    backoff_delay,
+)
+from app.core.ratelimit import AdaptiveLimiter, TokenBucket
+from app.services.pokeapi import (
+    background_refreshes,
+    fetch_pokemon,
+    parse_pokemon,
+    upstream_breaker,
+)
+from app.services.pokemon_cache import PokemonCache
+from app.tests.conftest import pokemon_payload
+
+URL = "https://pokeapi.co/api/v2/pokemon/25"
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def no_sleep(delay):
+    pass
+
+
+def resilient(handler, breaker=None, **kwargs):
+    upstream = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    breaker = breaker or CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    return ResilientClient(upstream, breaker, sleep=no_sleep, **kwargs)
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_probes_after_timeout(self):
+        timer = FakeTimer()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, timer=timer)
+
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+
+        timer.now = 30
+        assert breaker.allow()
+        assert breaker.state == "half_open"
+        assert not breaker.allow()
+
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.retry_after() == 30
+
+        timer.now = 60
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+        assert breaker.stats()["trips"] == 2
+
+    def test_backoff_is_jittered_and_capped(self):
+        assert backoff_delay(0, 0.1, 2.0, rng=lambda: 1.0) == 0.1
+        assert backoff_delay(3, 0.1, 2.0, rng=lambda: 0.5) == 0.4
+        assert backoff_delay(10, 0.1, 2.0, rng=lambda: 1.0) == 2.0
+
+
+class TestResilientClient:
+    def test_retries_server_errors(self):
+        statuses = [503, 500, 200]
+
+        async def handler(request):
+            return httpx.Response(statuses.pop(0), json={})
+
+        response = asyncio.run(resilient(handler).get(URL))
+        assert response.status_code == 200
+        assert statuses == []
+
+    def test_not_found_is_not_retried(self):
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            return httpx.Response(404)
+
+        upstream = resilient(handler)
+        assert asyncio.run(upstream.get(URL)).status_code == 404
+        assert len(calls) == 1
+        assert upstream.breaker.failures == 0
+
+    def test_exhausted_retries_trip_the_breaker(self):
+        async def handler(request):
+            raise httpx.ConnectError("refused")
+
+        upstream = resilient(handler, retries=1)
+        for _ in range(2):
+            with pytest.raises(UpstreamUnavailable):
+                asyncio.run(upstream.get(URL))
+
+        assert upstream.breaker.state == "open"
+        with pytest.raises(UpstreamUnavailable) as excinfo:
+            asyncio.run(upstream.get(URL))
+        assert excinfo.value.retry_after > 0
+
+    def test_deadline_covers_every_attempt(self):
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200)
+
+        with pytest.raises(UpstreamUnavailable):
+            asyncio.run(resilient(handler, deadline=0.05).get(URL))
+
+
+class TestLocalLimits:
+    @staticmethod
+    async def healthy(request):
+        return httpx.Response(200, json={})
+
+    @staticmethod
+    def limiter():
+        return AdaptiveLimiter(
+            initial=50, min_limit=1, max_limit=100, latency_target=1.0
+        )
+
+    def test_queuing_for_the_rate_limit_is_not_an_upstream_timeout(self):
+        # 60 calls at 100/s after a burst of 10 queue for half a second,
+        # far longer than the deadline of each call
+        upstream = resilient(
+            self.healthy,
+            deadline=0.2,
+            rate_limiter=TokenBucket(rate=100, burst=10),
+            concurrency_limiter=self.limiter(),
+        )
+
+        async def main():
+            return await asyncio.gather(*(upstream.get(URL) for _ in range(60)))
+
+        responses = asyncio.run(main())
+        assert [r.status_code for r in responses] == [200] * 60
+        assert upstream.breaker.stats()["state"] == "closed"
+        assert upstream.breaker.failures == 0
+        assert upstream.concurrency_limiter.stats()["decreases"] == 0
+
+    def test_queue_timeout_is_not_reported_upstream(self):
+        limiter = self.limiter()
+        upstream = resilient(
+            self.healthy,
+            rate_limiter=TokenBucket(rate=10, burst=1),
+            concurrency_limiter=limiter,
+            queue_timeout=0.05,
+        )
+
+        async def main():
+            return await asyncio.gather(
+                *(upstream.get(URL) for _ in range(5)), return_exceptions=True
+            )
+
+        results = asyncio.run(main())
+        assert results[0].status_code == 200
+        assert all(isinstance(r, UpstreamThrottled) for r in results[1:])
+        assert upstream.breaker.failures == 0
+        assert limiter.stats()["decreases"] == 0
+        assert limiter.in_flight == 0
+
+
+class TestStaleWhileRevalidate:
+    def test_stale_entry_is_served_then_refreshed(self):
+        requests = []
+
+        async def handler(request):
+            requests.append(request)
+            payload = pokemon_payload(25, "pikachu")
+            payload["weight"] = 60
+            return httpx.Response(200, json=payload)
+
+        async def main():
+            cache = PokemonCache(session_factory=None, ttl=0, stale=60)
+            await cache.set(parse_pokemon(pokemon_payload(25, "pikachu")))
+            upstream = resilient(handler)
+
+            pokemon = await fetch_pokemon(upstream, cache, URL)
+            await asyncio.gather(*background_refreshes)
+            return pokemon, cache
+
+        pokemon, cache = asyncio.run(main())
+        assert pokemon.weight == 69
+        assert len(requests) == 1
+        assert cache.stats()["stale_hits"] == 1
+        assert cache.memory.get("25")[0].weight == 60
+
+    def test_expired_entries_are_not_returned_as_fresh(self):
+        async def main():
+            cache = PokemonCache(session_factory=None, ttl=0, stale=60)
+            await cache.set(parse_pokemon(pokemon_payload(25, "pikachu")))
+            return await cache.get(25), await cache.lookup("pikachu")
+
+        fresh, (stale, is_fresh) = asyncio.run(main())
+        assert fresh is None
+        assert stale.name == "pikachu"
+        assert not is_fresh
+
+
+class TestOpenCircuit:
+    def test_endpoint_fails_fast_with_retry_after(
+        self, client, auth_headers, fake_pokeapi
+    ):
+        for _ in range(upstream_breaker.failure_threshold):
+            upstream_breaker.record_failure()
+
+        response = client.get("/api/v1/pokemon/1", headers=auth_headers)
+        assert response.status_code == 503
+        assert int(response.headers["retry-after"]) > 0
+        assert fake_pokeapi.requests == []
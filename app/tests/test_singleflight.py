@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.singleflight import SingleFlight
+from app.services.pokeapi import fetch_pokemon, normalize_url
+from app.services.pokemon_cache import PokemonCache
+from app.tests.conftest import pokemon_payload
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_result(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def main():
+            return await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+
+        assert asyncio.run(main()) == ["result"] * 5
+        assert len(calls) == 1
+        assert flights.stats() == {"in_flight": 0, "leaders": 1, "shared": 4}
+
+    def test_errors_are_shared_and_not_remembered(self):
+        flights = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def main():
+            return await asyncio.gather(
+                *(flights.do("key", fail) for _ in range(3)), return_exceptions=True
+            )
+
+        results = asyncio.run(main())
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(flights) == 0
+
+    def test_cancelled_caller_does_not_cancel_followers(self):
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "result"
+
+        async def main():
+            leader = asyncio.ensure_future(flights.do("key", work))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flights.do("key", work))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        assert asyncio.run(main()) == "result"
+
+
+class TestUpstreamCoalescing:
+    def test_identical_fetches_hit_upstream_once(self):
+        requests = []
+
+        async def handler(request):
+            requests.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json=pokemon_payload(25, "pikachu"))
+
+        async def main():
+            cache = PokemonCache(session_factory=None)
+            async with httpx.AsyncClient(
+                transport=httpx.MockTransport(handler)
+            ) as upstream:
+                return await asyncio.gather(
+                    *(
+                        fetch_pokemon(upstream, cache, url)
+                        for url in [
+                            "https://pokeapi.co/api/v2/pokemon/pikachu",
+                            "https://pokeapi.co/api/v2/pokemon/Pikachu/",
+                        ]
+                        * 10
+                    )
+                )
+
+        results = asyncio.run(main())
+        assert {pokemon.id for pokemon in results} == {25}
+        assert len(requests) == 1
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://pokeapi.co/api/v2/pokemon/Pikachu/",
+            "HTTPS://POKEAPI.CO/api/v2/pokemon/pikachu",
+        ],
+    )
+    def test_normalize_url(self, url):
+        assert normalize_url(url) == "https://pokeapi.co/api/v2/pokemon/pikachu"
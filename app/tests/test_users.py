@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.user import User
+
+
+client = TestClient(app)
+
+
+class TestPrincipalCache:
+    def test_repeat_requests_skip_the_users_table(
+        self, auth_headers, db_session, sample_user
+    ):
+        assert client.get("/api/v1/users/me", headers=auth_headers).status_code == 200
+
+        # The principal is cached, so the row is not read again
+        db_session.query(User).delete()
+        db_session.commit()
+
+        response = client.get("/api/v1/users/me", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["username"] == sample_user.username
+
+    def test_deactivation_revokes_access(self, auth_headers):
+        assert client.get("/api/v1/users/me", headers=auth_headers).status_code == 200
+
+        response = client.delete("/api/v1/users/me", headers=auth_headers)
+        assert response.status_code == 204
+
+        response = client.get("/api/v1/users/me", headers=auth_headers)
+        assert response.status_code == 401
+
+    def test_profile_update_refreshes_principal(self, auth_headers):
+        client.get("/api/v1/users/me", headers=auth_headers)
+
+        response = client.put(
+            "/api/v1/users/me",
+            json={"email": "updated@example.com"},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+
+        response = client.get("/api/v1/users/me", headers=auth_headers)
+        assert response.json()["email"] == "updated@example.com"
+
+    def test_renamed_user_old_token_is_rejected(self, auth_headers):
+        client.get("/api/v1/users/me", headers=auth_headers)
+
+        response = client.put(
+            "/api/v1/users/me", json={"username": "renamed"}, headers=auth_headers
+        )
+        assert response.status_code == 200
+
+        response = client.get("/api/v1/users/me", headers=auth_headers)
+        assert response.status_code == 401
@@ -0,0 +1,190 @@
+"""Compare the memory a worker spends holding the Pokemon catalog.
+
+Usage:
+    python -m benchmarks.catalog_memory --pokemon 1302 --copies 10
+
+Each layout is built in a fresh interpreter from ``--pokemon`` synthetic
+PokeAPI payloads, parsed the way the importer parses them, and repeated
+``--copies`` times to stand in for larger catalogs:
+
+  models    a list of Pokemon models, as the filter index used to keep
+  catalog   PokemonCatalog: typed arrays, packed names and interned
+            type/ability/sprite vocabularies
+  mapped    the same catalog saved once and mapped from a catalog file,
+            as every worker does with POKEMON_CATALOG_PATH set
+
+Reported per layout: the growth in resident set size and in private
+(unshared) memory, both Linux only, and the bytes still allocated per
+Pokemon according to tracemalloc. The mapped file's pages count as private
+here because a single process maps them; across workers they are shared.
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from multiprocessing.context import SpawnContext
+from typing import Any, Iterable, Iterator, List, Optional, Union
+
+from app.schemas.task import Pokemon
+from app.services.catalog import PokemonCatalog, load_catalog, save_catalog
+from app.services.pokeapi import parse_pokemon
+
+TYPES = [
+    "normal", "fire", "water", "grass", "electric", "ice", "fighting", "poison",
+    "ground", "flying", "psychic", "bug", "rock", "ghost", "dragon", "dark",
+    "steel", "fairy",
+]  # fmt: skip
+ABILITIES = [f"ability-{i}" for i in range(300)]
+PRIVATE_FIELDS = ("Private_Clean", "Private_Dirty")
+SPRITES = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon"
+
+
+def payloads(count: int, copies: int) -> Iterator[dict]:
+    rng = random.Random(0)
+    for copy in range(copies):
+        for i in range(1, count + 1):
+            pokemon_id = copy * count + i
+            payload = {
+                "id": pokemon_id,
+                "name": f"pokemon-{pokemon_id}",
+                "height": rng.randint(1, 200),
+                "weight": rng.randint(1, 9999),
+                "types": [
+                    {"type": {"name": name}}
+                    for name in rng.sample(TYPES, rng.randint(1, 2))
+                ],
+                "abilities": [
+                    {"ability": {"name": name}}
+                    for name in rng.sample(ABILITIES, rng.randint(1, 3))
+                ],
+                "sprites": {"front_default": f"{SPRITES}/{pokemon_id}.png"},
+            }
+            # Decoded like a PokeAPI response, with strings of its own
+            yield json.loads(json.dumps(payload))
+
+
+def pokemon(count: int, copies: int) -> Iterator[Pokemon]:
+    return (parse_pokemon(payload) for payload in payloads(count, copies))
+
+
+def rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return None
+
+
+def private_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            fields = dict(line.split(":", 1) for line in smaps if ":" in line)
+    except OSError:
+        return None
+    return sum(int(fields[key].split()[0]) * 1024 for key in PRIVATE_FIELDS)
+
+
+def build(
+    layout: str, count: int, copies: int, path: str
+) -> Union[List[Pokemon], PokemonCatalog]:
+    if layout == "models":
+        return list(pokemon(count, copies))
+    if layout == "mapped":
+        catalog = load_catalog(path)
+        # Fault every page in, as serving the whole catalog would
+        columns: List[Iterable[int]] = [catalog.ids, catalog.heights, catalog.weights]
+        columns += [catalog.height_order, catalog.weight_order]
+        columns += [catalog.types.codes, catalog.abilities.codes]
+        columns += [catalog.names.data, catalog.sprite_names.data]
+        for column in columns:
+            sum(column)
+        return catalog
+    return PokemonCatalog(pokemon(count, copies))
+
+
+def measure(
+    layout: str,
+    count: int,
+    copies: int,
+    path: str,
+    trace: bool,
+    results: "multiprocessing.Queue[Any]",
+) -> None:
+    """Build one layout and report its memory, or its allocations if trace"""
+    if trace:
+        tracemalloc.start()
+    rss_before, private_before = rss_bytes(), private_bytes()
+    started = time.perf_counter()
+    store = build(layout, count, copies, path)
+    elapsed = time.perf_counter() - started
+    if trace:
+        results.put(tracemalloc.get_traced_memory()[0])
+        return
+
+    rss_after, private_after = rss_bytes(), private_bytes()
+    # Materializing a page is the catalog's cost at serialization time
+    started = time.perf_counter()
+    for position in range(min(100, len(store))):
+        store[position].model_dump_json()
+    page_time = time.perf_counter() - started
+    rss = None
+    if rss_before is not None and rss_after is not None:
+        rss = rss_after - rss_before
+    private = None
+    if private_before is not None and private_after is not None:
+        private = private_after - private_before
+    results.put((rss, private, elapsed, page_time))
+
+
+def run(context: SpawnContext, *args: Any) -> Any:
+    results = context.Queue()
+    process = context.Process(target=measure, args=(*args, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--pokemon", type=int, default=1302)
+    parser.add_argument("--copies", type=int, default=10)
+    args = parser.parse_args()
+    total = args.pokemon * args.copies
+
+    # A fresh interpreter per run keeps one layout from reusing the other's
+    # heap, and tracemalloc's own overhead out of the memory figures
+    context = multiprocessing.get_context("spawn")
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, "catalog.bin")
+    save_catalog(PokemonCatalog(pokemon(args.pokemon, args.copies)), path)
+
+    print(f"Catalog of {total} Pokemon")
+    print(
+        f"  {'layout':<8} {'RSS MiB':>8} {'private':>8} {'B/Pokemon':>10} "
+        f"{'build s':>8} {'page ms':>8}"
+    )
+    for layout in ("models", "catalog", "mapped"):
+        rss, private, elapsed, page_time = run(
+            context, layout, args.pokemon, args.copies, path, False
+        )
+        traced = run(context, layout, args.pokemon, args.copies, path, True)
+        print(
+            f"  {layout:<8} {mebibytes(rss):>8} {mebibytes(private):>8} "
+            f"{traced / total:>10.0f} {elapsed:>8.2f} {page_time * 1000:>8.2f}"
+        )
+    directory.cleanup()
+
+
+def mebibytes(size: Optional[int]) -> str:
+    return "n/a" if size is None else f"{size / 2**20:.1f}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Benchmark favorites queries before and after the composite indexes.
+
+Usage:
+    python -m benchmarks.favorites_indexes --rows 1000000
+
+Builds a throwaway SQLite database with ``--rows`` favorites, times the
+queries issued by app/routers/favorites.py with only the primary key
+index, then adds the indexes declared on the Favorite model and times
+them again.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from sqlalchemy import Engine, create_engine, insert, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.database import Base
+from app.models.task import Favorite
+from app.models.user import User
+
+NEW_INDEXES = ("uq_favorites_user_pokemon", "ix_favorites_user_active_created")
+
+
+def populate(engine: Engine, rows: int, per_user: int) -> int:
+    """Insert rows favorites spread over users, returning the user count"""
+    users = max(rows // per_user, 1)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "username": f"user{user_id}",
+                    "email": f"user{user_id}@example.com",
+                    "hashed_password": "x",
+                    "is_active": True,
+                    "created_at": start,
+                }
+                for user_id in range(1, users + 1)
+            ],
+        )
+        batch = []
+        for n in range(rows):
+            user_id, pokemon_id = n % users + 1, n // users + 1
+            batch.append(
+                {
+                    "user_id": user_id,
+                    "pokemon_id": pokemon_id,
+                    "pokemon_name": f"pokemon{pokemon_id}",
+                    "is_active": random.random() < 0.8,
+                    "created_at": start + timedelta(seconds=n),
+                }
+            )
+            if len(batch) == 50_000:
+                conn.execute(insert(Favorite), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Favorite), batch)
+    return users
+
+
+def time_queries(
+    session_factory: Callable[[], Session], users: int, per_user: int, samples: int
+) -> Dict[str, List[float]]:
+    """Time the favorites list and check queries, in milliseconds"""
+    rng = random.Random(42)
+    timings: Dict[str, List[float]] = {"list active": [], "check one": []}
+    db = session_factory()
+    try:
+        for _ in range(samples):
+            user_id = rng.randint(1, users)
+            pokemon_id = rng.randint(1, per_user)
+
+            started = time.perf_counter()
+            db.query(Favorite).filter(
+                Favorite.user_id == user_id, Favorite.is_active == True
+            ).order_by(Favorite.created_at.desc(), Favorite.id.desc()).limit(50).all()
+            timings["list active"].append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            db.query(Favorite).filter(
+                Favorite.user_id == user_id,
+                Favorite.pokemon_id == pokemon_id,
+                Favorite.is_active == True,
+            ).first()
+            timings["check one"].append((time.perf_counter() - started) * 1000)
+    finally:
+        db.close()
+    return timings
+
+
+def report(label: str, timings: dict) -> None:
+    print(label)
+    for query, values in timings.items():
+        values = sorted(values)
+        p95 = values[int(len(values) * 0.95) - 1]
+        print(
+            f"  {query:<12} mean {statistics.mean(values):8.3f} ms"
+            f"   p95 {p95:8.3f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--per-user", type=int, default=100)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            for name in NEW_INDEXES:
+                conn.execute(text(f"DROP INDEX {name}"))
+
+        started = time.perf_counter()
+        users = populate(engine, args.rows, args.per_user)
+        print(
+            f"Inserted {args.rows} favorites for {users} users "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        session_factory = sessionmaker(bind=engine)
+
+        report(
+            "Before (primary key only):",
+            time_queries(session_factory, users, args.per_user, args.samples),
+        )
+
+        started = time.perf_counter()
+        for index in Favorite.__table__.indexes:
+            if index.name in NEW_INDEXES:
+                index.create(bind=engine)
+        print(f"Built indexes in {time.perf_counter() - started:.1f}s")
+
+        report(
+            "After (composite indexes):",
+            time_queries(session_factory, users, args.per_user, args.samples),
+        )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
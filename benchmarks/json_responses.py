@@ -0,0 +1,128 @@
+"""Compare CPU per response for the list and favorites serialization paths.
+
+Usage:
+    python -m benchmarks.json_responses --items 100 --iterations 2000
+
+Builds a Pokemon list page and a favorites page of ``--items`` entries and
+times, per response:
+
+  jsonable_encoder   jsonable_encoder + json.dumps (JSONResponse without
+                     a response_model, and older FastAPI releases)
+  response_model     FastAPI validating the returned model against the
+                     route's response_model and dumping it to JSON
+  pydantic_response  PydanticJSONResponse, which the list handlers return
+                     so the model is serialized once and not revalidated
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from fastapi import APIRouter
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute, serialize_response
+
+from app.core.responses import PydanticJSONResponse
+from app.routers import favorites, pokemon
+from app.schemas.task import (
+    Favorite,
+    FavoriteResponse,
+    Pokemon,
+    PokemonSearchResponse,
+)
+
+
+def list_page(items: int) -> PokemonSearchResponse:
+    return PokemonSearchResponse(
+        results=[
+            Pokemon(
+                id=i,
+                name=f"pokemon{i}",
+                height=7,
+                weight=69,
+                types=["grass", "poison"],
+                abilities=["overgrow", "chlorophyll"],
+                sprite_url=(
+                    "https://raw.githubusercontent.com/PokeAPI/sprites/master/"
+                    f"sprites/pokemon/{i}.png"
+                ),
+            )
+            for i in range(1, items + 1)
+        ],
+        count=1302,
+        next_url=f"http://testserver/api/v1/pokemon/?limit={items}&offset={items}",
+    )
+
+
+def favorites_page(items: int) -> FavoriteResponse:
+    start = datetime(2024, 1, 1)
+    return FavoriteResponse(
+        favorites=[
+            Favorite(
+                id=i,
+                user_id=1,
+                pokemon_id=i,
+                pokemon_name=f"pokemon{i}",
+                is_active=True,
+                created_at=start + timedelta(minutes=i),
+            )
+            for i in range(1, items + 1)
+        ],
+        total=items,
+        next_cursor="WyIyMDI0LTAxLTAxVDAwOjAwOjAwIiwgMV0=",
+    )
+
+
+def response_field(router: APIRouter, path: str) -> Any:
+    route = next(
+        route
+        for route in router.routes
+        if isinstance(route, APIRoute) and route.path == path
+    )
+    return route.response_field
+
+
+def time_per_call(fn: Callable[[], object], iterations: int) -> float:
+    """Mean CPU time of fn in microseconds"""
+    fn()
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    cases = {
+        "list": (list_page(args.items), response_field(pokemon.router, "/")),
+        "favorites": (
+            favorites_page(args.items),
+            response_field(favorites.router, "/"),
+        ),
+    }
+
+    print(f"CPU per response, {args.items} items")
+    for name, (page, field) in cases.items():
+        paths = {
+            "jsonable_encoder": lambda: json.dumps(jsonable_encoder(page)).encode(),
+            "response_model": lambda: loop.run_until_complete(
+                serialize_response(field=field, response_content=page, dump_json=True)
+            ),
+            "pydantic_response": lambda: PydanticJSONResponse(page).body,
+        }
+        print(f"  {name}")
+        for label, fn in paths.items():
+            print(f"    {label:<18} {time_per_call(fn, args.iterations):9.1f} us")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
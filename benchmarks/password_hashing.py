@@ -0,0 +1,84 @@
+"""Report password hashing latency for candidate hashing settings.
+
+Usage:
+    python -m benchmarks.password_hashing --scheme bcrypt --rounds 10 11 12 13
+    python -m benchmarks.password_hashing --scheme argon2 \\
+        --memory-cost 19456 65536 --time-cost 2 3 --parallelism 1 4
+
+Each candidate is built with app.core.passwords.build_password_context, the
+same policy builder the API uses, so the numbers translate directly into
+the per-login CPU cost of a worker.
+"""
+
+import argparse
+import itertools
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.passwords import build_password_context
+
+
+def measure(context: CryptContext, iterations: int) -> Tuple[float, float]:
+    """Median hash and verify latency in milliseconds"""
+    hashes, verifies = [], []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        hashed = context.hash("correct horse battery staple")
+        hashes.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        context.verify("correct horse battery staple", hashed)
+        verifies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(hashes), statistics.median(verifies)
+
+
+def candidates(args: argparse.Namespace) -> List[Tuple[str, Dict[str, Any]]]:
+    if args.scheme == "bcrypt":
+        return [
+            (f"bcrypt rounds={rounds}", {"bcrypt_rounds": rounds})
+            for rounds in args.rounds
+        ]
+    return [
+        (
+            f"argon2 m={memory} t={time_cost} p={parallelism}",
+            {
+                "argon2_memory_cost": memory,
+                "argon2_time_cost": time_cost,
+                "argon2_parallelism": parallelism,
+            },
+        )
+        for memory, time_cost, parallelism in itertools.product(
+            args.memory_cost, args.time_cost, args.parallelism
+        )
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default="bcrypt")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument(
+        "--memory-cost", type=int, nargs="+", default=[settings.argon2_memory_cost]
+    )
+    parser.add_argument(
+        "--time-cost", type=int, nargs="+", default=[settings.argon2_time_cost]
+    )
+    parser.add_argument(
+        "--parallelism", type=int, nargs="+", default=[settings.argon2_parallelism]
+    )
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'candidate':<32} {'hash ms':>9} {'verify ms':>10} {'logins/s/core':>14}")
+    for label, options in candidates(args):
+        context = build_password_context(schemes=[args.scheme], **options)
+        hash_ms, verify_ms = measure(context, args.iterations)
+        print(f"{label:<32} {hash_ms:9.1f} {verify_ms:10.1f} {1000 / verify_ms:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Benchmark concurrent favorites writes against the SQLite profiles.
+
+Usage:
+    python -m benchmarks.sqlite_writes --writers 50 --writes 20
+
+Each profile gets a fresh SQLite file. ``--writers`` coroutines each add
+``--writes`` favorites the way POST /favorites/{pokemon_id} does (look up
+the row, insert, commit), through an aiosqlite engine with the default
+pool. The profiles are:
+
+  default     rollback journal, synchronous=FULL, writers contend for the lock
+  wal         the pragmas from app/core/sqlite.py, writers still contend
+  wal+queue   the pragmas plus the in-process writer queue the API uses
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Type
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import Base, to_async_url
+from app.core.sqlite import SerializedWriteSession, SQLiteWriter, apply_sqlite_pragmas
+from app.models.task import Favorite
+from app.models.user import User
+
+PROFILES = ("default", "wal", "wal+queue")
+
+
+def prepare(url: str, writers: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "username": f"user{user_id}",
+                    "email": f"user{user_id}@example.com",
+                    "hashed_password": "x",
+                    "is_active": True,
+                }
+                for user_id in range(1, writers + 1)
+            ],
+        )
+    engine.dispose()
+
+
+async def run_profile(url: str, profile: str, writers: int, writes: int) -> dict:
+    """Write latencies in milliseconds, elapsed seconds and failed writes"""
+    engine = create_async_engine(to_async_url(url))
+    session_class: Type[AsyncSession] = AsyncSession
+    if profile != "default":
+        apply_sqlite_pragmas(engine.sync_engine)
+    if profile == "wal+queue":
+
+        class QueuedWriteSession(SerializedWriteSession):
+            writer = SQLiteWriter()
+
+        session_class = QueuedWriteSession
+
+    session_factory = async_sessionmaker(
+        engine, class_=session_class, expire_on_commit=False
+    )
+    latencies, failures = [], 0
+
+    async def writer(user_id: int) -> None:
+        nonlocal failures
+        for pokemon_id in range(1, writes + 1):
+            started = time.perf_counter()
+            async with session_factory() as db:
+                try:
+                    await db.scalar(
+                        select(Favorite).filter(
+                            Favorite.user_id == user_id,
+                            Favorite.pokemon_id == pokemon_id,
+                        )
+                    )
+                    db.add(
+                        Favorite(
+                            user_id=user_id,
+                            pokemon_id=pokemon_id,
+                            pokemon_name=f"pokemon{pokemon_id}",
+                        )
+                    )
+                    await db.commit()
+                except OperationalError:
+                    await db.rollback()
+                    failures += 1
+                    continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(user_id) for user_id in range(1, writers + 1)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return {"latencies": latencies, "elapsed": elapsed, "failures": failures}
+
+
+def report(profile: str, result: dict) -> None:
+    latencies = sorted(result["latencies"]) or [0.0]
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    throughput = len(result["latencies"]) / result["elapsed"]
+    print(
+        f"  {profile:<10} {throughput:8.1f} writes/s"
+        f"   mean {statistics.mean(latencies):8.2f} ms"
+        f"   p95 {p95:8.2f} ms   failed {result['failures']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--writers", type=int, default=50)
+    parser.add_argument("--writes", type=int, default=20)
+    parser.add_argument("--profile", choices=PROFILES, nargs="+", default=PROFILES)
+    args = parser.parse_args()
+
+    print(f"{args.writers} concurrent writers x {args.writes} favorites each")
+    for profile in args.profile:
+        with tempfile.TemporaryDirectory() as directory:
+            url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+            prepare(url, args.writers)
+            result = asyncio.run(run_profile(url, profile, args.writers, args.writes))
+            report(profile, result)
+
+
+if __name__ == "__main__":
+    main()